@@ -8,8 +8,8 @@ Currently, it defaults to Python's built-in `ast` module via
 PythonASTAdapter for backward compatibility during the transition.
 """
 import ast
-import astor
 import difflib
+import functools
 from typing import List, Optional, Dict, Union, Tuple, Type, Any
 from ast_adapter import ASTAdapter
 import os
@@ -21,6 +21,29 @@ except ImportError:
     ASTTOKENS_AVAILABLE = False
 
 
+def _astor_to_source(node: ast.AST) ->str:
+    """
+    Renders a node with astor for the adapter-less fallback paths.
+
+    astor is imported on first use, so a missing astor only matters when no
+    adapter is available.
+    """
+    import astor
+    return astor.to_source(node)
+
+
+@functools.lru_cache(maxsize=512)
+def _read_source_cached(path: str, mtime_ns: int, size: int) ->str:
+    """
+    Reads a source file, memoized on its (path, mtime, size) signature.
+
+    Any write to the file changes its stat signature, so stale entries are
+    never returned; they simply age out of the LRU.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
 class CodeEditor:
     """
     An enhanced class to safely edit files using AST/CST with partial edit support.
@@ -29,7 +52,7 @@ class CodeEditor:
     """
 
     def __init__(self, file_path: str, adapter_class: Optional[Type[
-        ASTAdapter]]=None):
+        ASTAdapter]]=None, source_code: Optional[str]=None):
         """
         Initializes the CodeEditor.
 
@@ -37,9 +60,12 @@ class CodeEditor:
             file_path: The path to the source file.
             adapter_class: The ASTAdapter subclass to use. If None, defaults to
                            PythonASTAdapter for .py files.
+            source_code: Optional in-memory source. If given, the file is not
+                         read from disk.
         """
         self.file_path = file_path
-        self.source_code = self._read_file()
+        self.source_code = (self._read_file() if source_code is None else
+            source_code)
         self.adapter: Optional[ASTAdapter] = None
         self.tree: Optional[ast.AST] = None
         self.nodes: Dict[str, ast.AST] = {}
@@ -56,7 +82,7 @@ class CodeEditor:
                         self.nodes = self._map_nodes()
                         if ASTTOKENS_AVAILABLE:
                             self.atok = asttokens.ASTTokens(self.
-                                source_code, parse=True)
+                                source_code, tree=self.tree)
                     except Exception as parse_error:
                         raise ValueError(
                             f'Failed to parse Python file: {parse_error}')
@@ -85,11 +111,29 @@ class CodeEditor:
                     f'Failed to initialize adapter {adapter_class.__name__}: {e}'
                     )
 
+    @classmethod
+    def from_source(cls, source: str, path: Optional[str]=None,
+        adapter_class: Optional[Type[ASTAdapter]]=None) ->'CodeEditor':
+        """
+        Creates an editor over in-memory source without touching the disk.
+
+        Useful for files that do not exist yet; nothing is written until
+        save_changes() is called.
+
+        Args:
+            source: The initial source code.
+            path: The path the file will be saved to. Its extension selects
+                  the adapter when adapter_class is not given.
+            adapter_class: Optional ASTAdapter subclass to use.
+        """
+        return cls(path or '', adapter_class, source_code=source)
+
     def _read_file(self) ->str:
-        """Reads the source file."""
+        """Reads the source file, reusing the cached text if it is unchanged."""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            st = os.stat(self.file_path)
+            return _read_source_cached(os.path.abspath(self.file_path), st.
+                st_mtime_ns, st.st_size)
         except FileNotFoundError:
             raise ValueError(f'File not found: {self.file_path}')
 
@@ -113,7 +157,7 @@ class CodeEditor:
             return self.adapter.get_source_of(element_name)
         else:
             node = self.nodes.get(element_name)
-            return astor.to_source(node) if node else None
+            return _astor_to_source(node) if node else None
 
     def get_element_structure(self, element_name: str) ->Optional[Dict]:
         """Gets detailed structure information about an element."""
@@ -164,7 +208,7 @@ class CodeEditor:
                         statements.append(stmt)
             if not statements:
                 return None
-            return '\n'.join(astor.to_source(stmt).strip() for stmt in
+            return '\n'.join(_astor_to_source(stmt).strip() for stmt in
                 statements)
 
     def replace_partial(self, element_name: str, new_code: str, line_start:
@@ -465,10 +509,10 @@ class CodeEditor:
         last_import_index = -1
         for i, node in enumerate(self.tree.body):
             if isinstance(node, (ast.Import, ast.ImportFrom)):
-                existing_imports_str.add(astor.to_source(node).strip())
+                existing_imports_str.add(_astor_to_source(node).strip())
                 last_import_index = i
         for new_import in reversed(new_import_nodes):
-            new_import_str = astor.to_source(new_import).strip()
+            new_import_str = _astor_to_source(new_import).strip()
             if new_import_str not in existing_imports_str:
                 self.tree.body.insert(last_import_index + 1, new_import)
 
@@ -491,8 +535,8 @@ class CodeEditor:
                 self.nodes = self._map_nodes()
                 if ASTTOKENS_AVAILABLE:
                     self.source_code = new_source_code
-                    self.atok = asttokens.ASTTokens(self.source_code, parse
-                        =True)
+                    self.atok = asttokens.ASTTokens(self.source_code, tree
+                        =self.tree)
                 return True
             except SyntaxError:
                 return False
@@ -502,7 +546,7 @@ class CodeEditor:
         if self.adapter:
             return self.adapter.get_modified_source()
         else:
-            return astor.to_source(self.tree)
+            return _astor_to_source(self.tree)
 
     def get_diff(self) ->str:
         """Generates a diff between the original source and the modified source."""
@@ -527,5 +571,8 @@ class CodeEditor:
     def save_changes(self) ->None:
         """Saves the modified source code back to the file."""
         modified_source = self.get_modified_source()
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         with open(self.file_path, 'w', encoding='utf-8') as f:
             f.write(modified_source)
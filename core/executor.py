@@ -1,5 +1,5 @@
 from utils.logger import log_execution_step
-from utils.io_helpers import safe_write_file
+from utils.io_helpers import safe_write_text
 from typing import List, Dict, Any
 import shutil
 import os
@@ -48,7 +48,7 @@ def execute_all_step(validated_plan: List[Dict[str, Any]], action_tracker:
                 with open(file_path, 'r') as f:
                     original_content = f.read()
                 modified_content = step.get('content', original_content)
-                safe_write_file(file_path, modified_content)
+                safe_write_text(file_path, modified_content)
                 log_execution_step(f'Modified file {file_path}')
             elif action == 'DELETE':
                 if os.path.exists(file_path):
@@ -1,6 +1,6 @@
 import subprocess
 import os
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 
 class GitManager:
@@ -75,7 +75,19 @@ class GitManager:
             A list of file paths relative to the repository root. For renamed or
             copied files, it returns the new path.
         """
-        status_output = self.get_status()
+        return self._parse_changed_files(self.get_status())
+
+    @staticmethod
+    def _parse_changed_files(status_output: str) -> List[str]:
+        """
+        Parses `git status --porcelain` output into a list of changed paths.
+
+        Args:
+            status_output: The porcelain status output.
+
+        Returns:
+            A de-duplicated list of file paths, using the new path for renames/copies.
+        """
         if not status_output:
             return []
         
@@ -135,6 +147,60 @@ class GitManager:
             cmd.append(file_path)
         return self._run_command(cmd)
 
+    def _run_commands_parallel(self, commands: List[List[str]]) ->List[bytes
+        ]:
+        """
+        Executes several Git commands concurrently in the repository's directory.
+
+        All processes are started before any output is read, so their startup
+        and execution overlap instead of running back to back. Output is kept
+        as raw bytes; only stderr is decoded, and only when a command fails.
+
+        Args:
+            commands: A list of commands, each a list of arguments starting with 'git'.
+
+        Returns:
+            The standard output of each command as bytes, in the same order.
+
+        Raises:
+            subprocess.CalledProcessError: If any command returns a non-zero exit code.
+        """
+        processes = [subprocess.Popen(command, cwd=self.repo_path, stdout=
+            subprocess.PIPE, stderr=subprocess.PIPE) for command in commands]
+        outputs = []
+        try:
+            for command, process in zip(commands, processes):
+                stdout, stderr = process.communicate()
+                if process.returncode != 0:
+                    error_message = (
+                        f"Git command failed: {' '.join(command)}\nError: {stderr.decode('utf-8', 'replace').strip()}"
+                        )
+                    raise subprocess.CalledProcessError(process.returncode,
+                        command, output=stdout, stderr=error_message)
+                outputs.append(stdout.strip())
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.kill()
+                    process.communicate()
+        return outputs
+
+    def snapshot(self) ->Tuple[List[str], bytes, bytes]:
+        """
+        Collects the changed files and both diffs in one concurrent batch.
+
+        The diffs are returned undecoded so that callers only pay for decoding
+        them when they are actually used.
+
+        Returns:
+            A tuple of (changed_files, staged_diff, unstaged_diff).
+        """
+        status_output, staged_diff, unstaged_diff = self._run_commands_parallel(
+            [['git', 'status', '--porcelain'], ['git', 'diff', '--cached'],
+            ['git', 'diff']])
+        return self._parse_changed_files(status_output.decode('utf-8',
+            'replace')), staged_diff, unstaged_diff
+
     def add(self, files: Union[str, List[str]]) ->None:
         """
     Stages one or more files, handling each one individually for robustness.
@@ -1,7 +1,6 @@
 import json
 import os
 from typing import List, Dict, Optional
-from rag_manager import RAGManager
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
@@ -12,7 +11,24 @@ class MemoryManager:
     def __init__(self, memory_file: str):
         self.memory_file = memory_file
         self.memory: Dict[str, List] = self.load_memory()
-        self.rag_manager = RAGManager()
+        self._reset_counts()
+        self._rag_manager = None
+
+    @property
+    def rag_manager(self):
+        """
+        The RAGManager is created on first use, so the embedding model and
+        FAISS index are only loaded when a RAG feature is actually needed.
+        """
+        if self._rag_manager is None:
+            from rag_manager import RAGManager
+            self._rag_manager = RAGManager()
+        return self._rag_manager
+
+    def _reset_counts(self) ->None:
+        """Recomputes the cached chat/look counts from the memory lists."""
+        self.chat_count = len(self.memory.get('chat', []))
+        self.look_count = len(self.memory.get('look', []))
 
     def load_memory(self) ->Dict[str, List]:
         try:
@@ -29,10 +45,16 @@ class MemoryManager:
                 }
 
     def save_memory(self, memory: Optional[Dict[str, List]]=None) ->None:
+        """
+        Writes memory to a temporary file and renames it over the memory file,
+        so a reader never sees a partially written JSON document.
+        """
         if memory is None:
             memory = self.memory
-        with open(self.memory_file, 'w') as f:
+        tmp_file = self.memory_file + '.tmp'
+        with open(tmp_file, 'w') as f:
             json.dump(memory, f, indent=4)
+        os.replace(tmp_file, self.memory_file)
 
     def add_message(self, role: str, content: str) ->None:
         """
@@ -43,6 +65,7 @@ class MemoryManager:
             content: The message content
         """
         self.memory['chat'].append({'role': role, 'content': content})
+        self.chat_count += 1
         self.save_memory()
 
     def add_chat_message(self, role: str, content: str) ->None:
@@ -109,7 +132,8 @@ class MemoryManager:
         plans = self.memory.get('refactor_plans', [])
         return plans[-limit:] if len(plans) > limit else plans
 
-    def add_look_data(self, file_path: str, content: str) ->None:
+    def add_look_data(self, file_path: str, content: str, flush: bool=True,
+        save: bool=True) ->None:
         """
     Adds a watched item (directory or file) to memory, distinguishing its type.
 
@@ -120,28 +144,40 @@ class MemoryManager:
     Args:
         file_path: The path to the directory or file.
         content: The manifest for a directory or the content for a file.
+        flush: Write the RAG index to disk right away, so other sessions can
+            retrieve the file. Bulk loaders pass False and call flush_rag once.
+        save: Write memory.json right away. Bulk loaders pass False and call
+            save_memory once.
     """
         item_type = 'directory' if os.path.isdir(file_path) else 'file'
         for item in self.memory['look']:
             if item.get('file') == file_path:
                 item['content'] = content
                 item['type'] = item_type
-                self.save_memory()
+                if save:
+                    self.save_memory()
                 return
         self.memory['look'].append({'type': item_type, 'file': file_path,
             'content': content})
-        self.save_memory()
+        self.look_count += 1
+        if save:
+            self.save_memory()
         if item_type == 'file':
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    file_content = f.read()
-                self.rag_manager.add_documents([file_content], [{'file':
-                    file_path}])
+                self.rag_manager.add_documents([content], [{'file': file_path}]
+                    )
+                if flush:
+                    self.rag_manager.flush()
             except Exception as e:
                 print(
                     f'[yellow]Warning: Could not add {file_path} to RAG index: {e}[/]'
                     )
 
+    def flush_rag(self) ->None:
+        """Writes pending RAG index changes to disk, if the index is loaded."""
+        if self._rag_manager is not None:
+            self._rag_manager.flush()
+
     def add_file_to_memory(self, file_path: str) ->None:
         """
         Add a file to memory by reading its content and storing it.
@@ -224,9 +260,16 @@ class MemoryManager:
     def clear_memory(self) ->None:
         self.memory = {'chat': [], 'look': [], 'actions': [],
             'refactor_plans': []}
+        self._reset_counts()
         self.save_memory()
         self.rag_manager.clear_index()
 
+    def clear_look_data(self) ->None:
+        """Drops all watched directories and files from memory."""
+        self.memory['look'] = []
+        self.look_count = 0
+        self.save_memory()
+
     def search_rag(self, query: str, k: int=3) ->List[tuple]:
         """
         Search the RAG index for relevant documents.
@@ -11,20 +11,26 @@ import sys
 import re
 import argparse
 import ast
+import hashlib
+import functools
+import itertools
+import time
 from datetime import datetime
 import threading
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Iterator, Iterable, Union, Callable
 from rich import print
 from rich.panel import Panel
 from rich.console import Console
 from rich.tree import Tree
+from rich.text import Text
 from ui_manager import UIManager
 from personality_manager import PersonalityManager
 from memory_manager import MemoryManager
 from code_editor import CodeEditor
 from file_creator import FileCreator
 from git_manager import GitManager
-from rag_manager import RAGManager
 import traceback
 DEFAULT_BACKEND = 'openrouter'
 OLLAMA_MODEL = 'phi4-reasoning'
@@ -36,6 +42,9 @@ OLLAMA_API_URL = 'http://localhost:11434/api/generate'
 OPENROUTER_API_URL = 'https://openrouter.ai/api/v1/chat/completions'
 OPENROUTER_MODELS_API_URL = 'https://openrouter.ai/api/v1/models'
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+_DEBUG = bool(os.getenv('OMNIFORGE_DEBUG'))
+_PROMPT_PLACEHOLDER = '__OMNI_PROMPT__'
+_RAG_QUERY_MAX_CHARS = 2000
 current_backend = DEFAULT_BACKEND
 current_model = (OLLAMA_MODEL if DEFAULT_BACKEND == 'ollama' else
     OPENROUTER_MODEL)
@@ -102,18 +111,49 @@ def start_ollama_server() ->None:
             stderr=subprocess.DEVNULL)
 
 
-def query_llm(prompt: str) ->str:
+def _get_rag():
+    """
+    Returns the session's RAGManager. It is the one memory_manager adds looked
+    at files to, so the embedding model and FAISS index are loaded once and
+    new documents are searchable without reloading anything.
+    """
+    return memory_manager.rag_manager
+
+
+def _prompt_prefix(prompt_parts: List[str], limit: int) ->str:
+    """
+    Returns the first `limit` characters of the joined prompt parts, slicing
+    only the parts that are needed instead of joining the whole prompt.
+    """
+    prefix = []
+    for part in prompt_parts:
+        if limit <= 0:
+            break
+        prefix.append(part[:limit])
+        limit -= len(prefix[-1])
+    return ''.join(prefix)
+
+
+def _build_prompt_parts(prompt_parts: List[str]) ->List[str]:
+    """
+    Wraps the user prompt with the personality, memory and RAG context.
+
+    The prompt is kept as a list of parts so that large inputs (such as git
+    diffs) can be sent to the backend without being joined into one string.
+    """
     personality = personality_manager.get_current_personality()
     system_prompt = personality.get('system_prompt', '') if personality else ''
     memory_context = memory_manager.get_memory_context()
     rag_context = ''
     try:
-        from rag_manager import RAGManager
         project_root = memory_manager.get_project_root()
         if project_root:
-            rag_manager = RAGManager()
+            rag_manager = _get_rag()
             if rag_manager.get_document_count() > 0:
-                results = rag_manager.search(prompt, k=3)
+                rag_query = prompt_parts[0] if len(prompt_parts
+                    ) == 1 else _prompt_prefix(prompt_parts,
+                    _RAG_QUERY_MAX_CHARS)
+                results = rag_manager.search(rag_query, k=3)
                 if results:
                     rag_context = '\n\nRelevant context from codebase:\n'
                     for i, (doc, score, meta) in enumerate(results, 1):
@@ -121,8 +161,25 @@ def query_llm(prompt: str) ->str:
                         rag_context += f'{i}. [{file_path}] {doc}\n'
     except Exception:
         pass
-    full_prompt = (
-        f'{system_prompt}\n\n{memory_context}{rag_context}\n\nUser: {prompt}')
+    return [f'{system_prompt}\n\n{memory_context}{rag_context}\n\nUser: ',
+        *prompt_parts]
+
+
+def _build_full_prompt(prompt: str) ->str:
+    return ''.join(_build_prompt_parts([prompt]))
+
+
+def query_llm(prompt: Union[str, Iterable[str]]) ->str:
+    """
+    Sends a prompt to the current backend and returns the full response.
+
+    The prompt may be a string or an iterable of string parts; parts are
+    streamed into the request body one by one instead of being concatenated.
+    """
+    if isinstance(prompt, str):
+        full_prompt = _build_full_prompt(prompt)
+    else:
+        full_prompt = _build_prompt_parts(list(prompt))
     with ui_manager.show_spinner('AI is listening and thinking...'):
         if current_backend == 'ollama':
             response = query_ollama(full_prompt)
@@ -133,16 +190,50 @@ def query_llm(prompt: str) ->str:
     return response
 
 
-def query_openrouter(prompt: str) ->str:
+def _stream_json_body(payload: Dict, prompt_parts: List[str]) ->Iterator[bytes
+    ]:
+    """
+    Serializes a request payload as a chunked JSON body, emitting each prompt
+    part in place of the _PROMPT_PLACEHOLDER value without joining them.
+    """
+    head, tail = json.dumps(payload).split(json.dumps(_PROMPT_PLACEHOLDER), 1)
+    yield (head + '"').encode('utf-8')
+    for part in prompt_parts:
+        if part:
+            yield json.dumps(part)[1:-1].encode('utf-8')
+    yield ('"' + tail).encode('utf-8')
+
+
+def query_llm_stream(prompt: str) ->Iterator[str]:
+    """
+    Streaming counterpart of query_llm. Yields response text chunks as the
+    backend produces them, so callers can start parsing before the model has
+    finished. Closing the generator early closes the underlying connection.
+    """
+    full_prompt = _build_full_prompt(prompt)
+    if current_backend == 'ollama':
+        yield from query_ollama_stream(full_prompt)
+    elif current_backend == 'openrouter':
+        yield from query_openrouter_stream(full_prompt)
+    else:
+        yield '[bold red]Error:[/] Unknown backend'
+
+
+def query_openrouter(prompt: Union[str, List[str]]) ->str:
     if not OPENROUTER_API_KEY:
         return '[bold red]Error:[/] OPENROUTER_API_KEY not set.'
     headers = {'Authorization': f'Bearer {OPENROUTER_API_KEY}',
         'Content-Type': 'application/json'}
-    payload = {'model': current_model, 'messages': [{'role': 'user',
-        'content': prompt}]}
+    if isinstance(prompt, str):
+        body = {'json': {'model': current_model, 'messages': [{'role':
+            'user', 'content': prompt}]}}
+    else:
+        body = {'data': _stream_json_body({'model': current_model,
+            'messages': [{'role': 'user', 'content': _PROMPT_PLACEHOLDER}]},
+            prompt)}
     try:
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=
-            payload, timeout=90)
+        response = requests.post(OPENROUTER_API_URL, headers=headers,
+            timeout=90, **body)
         response.raise_for_status()
         return response.json()['choices'][0]['message']['content']
     except Exception as e:
@@ -159,20 +250,91 @@ def query_openrouter(prompt: str) ->str:
             )
 
 
-def query_ollama(prompt: str) ->str:
-    payload = {'model': current_model, 'prompt': prompt, 'stream': False}
+def query_ollama(prompt: Union[str, List[str]]) ->str:
+    if isinstance(prompt, str):
+        body = {'json': {'model': current_model, 'prompt': prompt,
+            'stream': False}}
+    else:
+        body = {'data': _stream_json_body({'model': current_model,
+            'prompt': _PROMPT_PLACEHOLDER, 'stream': False}, prompt),
+            'headers': {'Content-Type': 'application/json'}}
     try:
-        response = requests.post(OLLAMA_API_URL, json=payload, timeout=90)
+        response = requests.post(OLLAMA_API_URL, timeout=90, **body)
         response.raise_for_status()
         return response.json()['response']
     except Exception as e:
         return f'[bold red]Ollama Error:[/] {e}'
 
 
+def query_openrouter_stream(prompt: str) ->Iterator[str]:
+    if not OPENROUTER_API_KEY:
+        yield '[bold red]Error:[/] OPENROUTER_API_KEY not set.'
+        return
+    headers = {'Authorization': f'Bearer {OPENROUTER_API_KEY}',
+        'Content-Type': 'application/json'}
+    payload = {'model': current_model, 'messages': [{'role': 'user',
+        'content': prompt}], 'stream': True}
+    try:
+        with requests.post(OPENROUTER_API_URL, headers=headers, json=
+            payload, timeout=90, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b'data: '):
+                    continue
+                data = line[6:]
+                if data == b'[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {})
+                if (content := delta.get('content')):
+                    yield content
+    except Exception as e:
+        yield f'[bold red]OpenRouter Error:[/] {e}'
+
+
+def query_ollama_stream(prompt: str) ->Iterator[str]:
+    payload = {'model': current_model, 'prompt': prompt, 'stream': True}
+    try:
+        with requests.post(OLLAMA_API_URL, json=payload, timeout=90,
+            stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if (content := data.get('response')):
+                    yield content
+                if data.get('done'):
+                    break
+    except Exception as e:
+        yield f'[bold red]Ollama Error:[/] {e}'
+
+
+_CODE_BLOCK_PATTERN = re.compile('```(\\w*)\\n([\\s\\S]*?)```')
+
+
+_EXTRACT_CODE_CACHE_SIZE = 256
+_extract_code_cache: 'OrderedDict[bytes, tuple]' = OrderedDict()
+
+
 def extract_code(text: str) ->List[tuple[str, str]]:
-    matches = re.findall('```(\\w*)\\n([\\s\\S]*?)```', text)
-    return [(lang or 'text', code.strip()) for lang, code in matches
-        ] if matches else []
+    """
+    Returns the (language, code) pairs of every fenced block in `text`.
+
+    Results are cached by a BLAKE2b digest of the text, so re-parsing the
+    same response (e.g. after 'send' and again on 'save') is free and the
+    cache does not keep the response strings themselves alive.
+    """
+    text_hash = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    blocks = _extract_code_cache.get(text_hash)
+    if blocks is None:
+        blocks = tuple((lang or 'text', code.strip()) for lang, code in
+            _CODE_BLOCK_PATTERN.findall(text))
+        _extract_code_cache[text_hash] = blocks
+        if len(_extract_code_cache) > _EXTRACT_CODE_CACHE_SIZE:
+            _extract_code_cache.popitem(last=False)
+    else:
+        _extract_code_cache.move_to_end(text_hash)
+    return list(blocks)
 
 
 def list_models(args: list=None) ->None:
@@ -313,7 +475,7 @@ def look_command(path: str) ->None:
         ui_manager.show_success(
             "New project directory detected. Clearing previous 'look' context."
             )
-        memory_manager.memory['look'] = []
+        memory_manager.clear_look_data()
         with ui_manager.show_spinner('Generating project manifest...'):
             manifest = generate_project_manifest(resolved_path)
         memory_manager.add_look_data(resolved_path, manifest)
@@ -456,16 +618,38 @@ def look_all_command() ->None:
                         content = f.read().strip()
                     if not any(look['file'] == full_path for look in
                         memory_manager.memory['look']):
-                        memory_manager.add_look_data(full_path, content)
+                        memory_manager.add_look_data(full_path, content,
+                            flush=False, save=False)
                         loaded_count += 1
                 except Exception as e:
                     print(
                         f"[yellow]Skipping '{file_path_relative}': {e}[/yellow]"
                         )
+        if loaded_count:
+            memory_manager.save_memory()
+        memory_manager.flush_rag()
     ui_manager.show_success(
         f'✅ Loaded content for {loaded_count} new files into memory.')
 
 
+_LOADER_MAX_WORKERS = 32
+_SAVE_MAX_WORKERS = 16
+
+
+def _read_text_or_error(path: str) ->tuple:
+    """
+    Reads a text file for the concurrent project loader.
+
+    Returns:
+        A (content, error) pair; exactly one of the two is None.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip(), None
+    except Exception as e:
+        return None, e
+
+
 def _load_all_project_files_if_needed():
     """
     Checks if a project is loaded and automatically loads any files from its
@@ -496,14 +680,22 @@ def _load_all_project_files_if_needed():
     loaded_count = 0
     with ui_manager.show_spinner(
         f'Auto-loading {len(files_to_load)} project files for context...'):
-        for full_path, file_path_relative in files_to_load:
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                memory_manager.add_look_data(full_path, content)
-                loaded_count += 1
-            except Exception as e:
-                print(f"[yellow]Skipping '{file_path_relative}': {e}[/yellow]")
+        with ThreadPoolExecutor(max_workers=min(_LOADER_MAX_WORKERS, len(
+            files_to_load))) as executor:
+            results = list(executor.map(_read_text_or_error, [full_path for
+                full_path, _ in files_to_load]))
+        for (full_path, file_path_relative), (content, error) in zip(
+            files_to_load, results):
+            if error is not None:
+                print(
+                    f"[yellow]Skipping '{file_path_relative}': {error}[/yellow]")
+                continue
+            memory_manager.add_look_data(full_path, content, flush=False,
+                save=False)
+            loaded_count += 1
+        if loaded_count:
+            memory_manager.save_memory()
+        memory_manager.flush_rag()
     if loaded_count > 0:
         ui_manager.show_success(
             f'✅ Loaded {loaded_count} new file(s) into memory for full project context.'
@@ -638,7 +830,8 @@ Code section to replace (lines {line_start}-{line_end}):
 Generate ONLY the replacement code for the specified lines:"""
 
 
-def handle_file_edit_command(file_path: str, instruction: str, apply_changes_immediately: bool = True):
+def handle_file_edit_command(file_path: str, instruction: str, apply_changes_immediately: bool = True,
+    editor: Optional[CodeEditor] = None):
     """
     Handles the entire workflow for editing a single file, ensuring full
     project context is loaded before the AI makes any decisions.
@@ -649,21 +842,28 @@ def handle_file_edit_command(file_path: str, instruction: str, apply_changes_imm
         instruction: The instruction for the AI on how to edit the file.
         apply_changes_immediately: If True, changes are saved to disk after confirmation.
                                    If False, the CodeEditor instance with pending changes is returned.
+        editor: An editor that already holds staged changes for this file (e.g. from an
+                earlier refactor action). It is edited in place instead of re-reading the
+                file from disk, which may not exist yet.
     """
     global last_code
     _load_all_project_files_if_needed()
-    resolved_path = resolve_file_path(file_path)
-    if not resolved_path:
-        ui_manager.show_error(f'File not found: {file_path}')
-        return None if not apply_changes_immediately else None
-    if resolved_path != os.path.abspath(file_path):
-        ui_manager.show_success(
-            f"Found '{file_path}' in project. Using: {resolved_path}")
-    try:
-        editor = CodeEditor(resolved_path)
-    except (ValueError, FileNotFoundError) as e:
-        ui_manager.show_error(str(e))
-        return None if not apply_changes_immediately else None
+    staged = editor is not None
+    if staged:
+        resolved_path = file_path
+    else:
+        resolved_path = resolve_file_path(file_path)
+        if not resolved_path:
+            ui_manager.show_error(f'File not found: {file_path}')
+            return None if not apply_changes_immediately else None
+        if resolved_path != os.path.abspath(file_path):
+            ui_manager.show_success(
+                f"Found '{file_path}' in project. Using: {resolved_path}")
+        try:
+            editor = CodeEditor(resolved_path)
+        except (ValueError, FileNotFoundError) as e:
+            ui_manager.show_error(str(e))
+            return None if not apply_changes_immediately else None
     elements = editor.list_elements()
     element_structures = {}
     for elem in elements:
@@ -676,7 +876,8 @@ def handle_file_edit_command(file_path: str, instruction: str, apply_changes_imm
         ai_response = query_llm(prompt1).strip()
     if ai_response.upper() == 'FILE':
         ui_manager.show_success('AI has chosen to edit the entire file.')
-        original_snippet = editor.source_code
+        original_snippet = (editor.get_modified_source() if staged else
+            editor.source_code)
         prompt2 = _create_prompt_for_element_rewrite(os.path.basename(
             resolved_path), 'entire file', instruction, original_snippet,
             is_full_file=True)
@@ -789,19 +990,12 @@ def handle_file_edit_command(file_path: str, instruction: str, apply_changes_imm
         return editor
 
 
-def _create_prompt_for_refactor_plan(instruction: str, memory_context: str
-    ) ->str:
-    """
-    Create a specialized prompt-generation function for the 'refactor' command.
-    This prompt will explicitly define the required JSON structure for the plan
-    and instruct the AI to act as an expert project manager.
-    """
-    return f"""You are an expert project manager and software architect. Analyze the project context and create a detailed refactoring plan.
+_REFACTOR_PLAN_PROMPT_HEADER = """You are an expert project manager and software architect. Analyze the project context and create a detailed refactoring plan.
 
 Your plan must be a valid JSON object with this exact structure:
-{{
+{
     "actions": [
-        {{
+        {
             "type": "MODIFY" | "CREATE" | "DELETE" | "PARTIAL",
             "file": "relative/path/to/file.py",
             "element": "function_or_class_name",  // For MODIFY/DELETE/PARTIAL
@@ -812,9 +1006,9 @@ Your plan must be a valid JSON object with this exact structure:
             "description": "What this action will accomplish",
             "anchor_element": "optional_anchor",   // Optional for CREATE
             "position": "before" | "after"         // Optional for CREATE
-        }}
+        }
     ]
-}}
+}
 
 ACTION TYPES:
 - MODIFY: Change an entire function, class, or method
@@ -832,14 +1026,80 @@ RULES FOR YOUR PLAN:
 - Order actions logically (e.g., create dependencies before using them)
 
 ### Project Context ###
-{memory_context}
+"""
+_REFACTOR_PLAN_PROMPT_MIDDLE = """
 
 ### Refactoring Request ###
-{instruction}
+"""
+_REFACTOR_PLAN_PROMPT_FOOTER = """
 
 Generate ONLY the JSON plan - no explanations or markdown:"""
 
 
+def _create_prompt_for_refactor_plan(instruction: str, memory_context: str
+    ) ->str:
+    """
+    Create a specialized prompt-generation function for the 'refactor' command.
+    This prompt will explicitly define the required JSON structure for the plan
+    and instruct the AI to act as an expert project manager.
+    """
+    return (_REFACTOR_PLAN_PROMPT_HEADER + memory_context +
+        _REFACTOR_PLAN_PROMPT_MIDDLE + instruction + _REFACTOR_PLAN_PROMPT_FOOTER)
+
+
+_JSON_SCAN_PATTERN = re.compile('[{}"\\\\]')
+
+
+class _JSONObjectScanner:
+    """
+    Incremental brace matcher that finds the first complete top-level JSON
+    object in a streamed response. String literals and escapes are honoured,
+    so braces inside JSON strings do not affect the nesting depth.
+
+    Only the structural characters are visited: a compiled regex skips over
+    everything else, so long string payloads are scanned at C speed.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._length = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape_at = -1
+
+    def feed(self, chunk: str) ->Optional[str]:
+        """Consumes a chunk and returns the object text once it is closed."""
+        base = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        for match in _JSON_SCAN_PATTERN.finditer(chunk):
+            pos = base + match.start()
+            ch = match.group()
+            if self._in_string:
+                if pos == self._escape_at:
+                    continue
+                if ch == '\\':
+                    self._escape_at = pos + 1
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '{':
+                if self._depth == 0:
+                    self._start = pos
+                self._depth += 1
+            elif ch == '}' and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self.text()[self._start:pos + 1]
+            elif ch == '"' and self._depth:
+                self._in_string = True
+        return None
+
+    def text(self) ->str:
+        """Returns everything received so far."""
+        return ''.join(self._parts)
+
+
 def _get_refactor_plan(instruction: str) ->Optional[List[Dict]]:
     """
     Generates a refactoring plan from the LLM.
@@ -861,13 +1121,21 @@ def _get_refactor_plan(instruction: str) ->Optional[List[Dict]]:
         return None
     memory_context = memory_manager.get_memory_context()
     plan_prompt = _create_prompt_for_refactor_plan(instruction, memory_context)
+    scanner = _JSONObjectScanner()
+    json_str = None
     with ui_manager.show_spinner('AI is creating an execution plan...'):
-        plan_str = query_llm(plan_prompt)
+        stream = query_llm_stream(plan_prompt)
+        try:
+            for chunk in stream:
+                if (json_str := scanner.feed(chunk)) is not None:
+                    break
+        finally:
+            stream.close()
+    plan_str = scanner.text()
     try:
-        match = re.search('\\{.*\\}', plan_str, re.DOTALL)
-        if not match:
+        if json_str is None:
             raise ValueError('No JSON object found in the response.')
-        plan = json.loads(match.group(0))
+        plan = json.loads(json_str)
         actions = plan.get('actions', [])
         if not actions:
             raise ValueError("No 'actions' key found in plan or plan is empty."
@@ -898,6 +1166,7 @@ def _display_and_confirm_plan(plan: Dict) ->bool:
         ui_manager.show_error('The generated plan is empty. Aborting.')
         return False
     ui_manager.show_success('AI has created a plan:')
+    lines: List[str] = []
     for i, action in enumerate(actions):
         action_type = action.get('type', 'N/A')
         element = action.get('element') or action.get('element_name', 'N/A')
@@ -906,13 +1175,15 @@ def _display_and_confirm_plan(plan: Dict) ->bool:
         if action_type == 'PARTIAL':
             line_start = action.get('line_start', '?')
             line_end = action.get('line_end', '?')
-            print(
-                f'  [cyan]{i + 1}. {action_type}:[/] {file_path}/{element} (lines {line_start}-{line_end}) - {reason}'
+            lines.append(
+                f'[cyan]{i + 1}. {action_type}:[/] {file_path}/{element} (lines {line_start}-{line_end}) - {reason}'
                 )
         else:
-            print(
-                f'  [cyan]{i + 1}. {action_type}:[/] {file_path}/{element} - {reason}'
+            lines.append(
+                f'[cyan]{i + 1}. {action_type}:[/] {file_path}/{element} - {reason}'
                 )
+    print(Panel('\n'.join(lines), title='[bold cyan]Plan[/]', border_style=
+        'cyan'))
     if ui_manager.get_user_input('\nProceed with this plan? (y/n): ').lower(
         ) in ['yes', 'y']:
         return True
@@ -935,21 +1206,33 @@ def _apply_refactor_changes(editors: Dict[str, CodeEditor]) ->None:
                  corresponding CodeEditor instances which hold the
                  proposed changes in their AST.
     """
-    full_diff = ''
+    parts = []
     for editor in editors.values():
         diff = editor.get_diff()
         if diff:
-            full_diff += diff + '\n'
-    if not full_diff.strip():
+            parts.append(diff)
+    if not parts:
         ui_manager.show_success('AI made no changes.')
         return
+    full_diff = '\n'.join(parts)
     print(Panel(full_diff, title=
         '[bold yellow]Proposed Project-Wide Changes[/]'))
     if ui_manager.get_user_input('Apply all changes? (y/n): ').lower() in [
         'yes', 'y']:
-        for editor in editors.values():
-            editor.save_changes()
-        ui_manager.show_success('✅ Project changes applied successfully.')
+        with ThreadPoolExecutor(max_workers=min(_SAVE_MAX_WORKERS, len(
+            editors))) as executor:
+            futures = {path: executor.submit(editor.save_changes) for path,
+                editor in editors.items()}
+        failures = [(path, future.exception()) for path, future in futures
+            .items() if future.exception() is not None]
+        for path, error in failures:
+            ui_manager.show_error(f"Failed to save '{path}': {error}")
+        if failures:
+            ui_manager.show_error(
+                f'{len(failures)} of {len(editors)} file(s) could not be saved.'
+                )
+        else:
+            ui_manager.show_success('✅ Project changes applied successfully.')
     else:
         ui_manager.show_error('Changes discarded.')
 
@@ -982,8 +1265,159 @@ RULES:
 Generate the new element code:"""
 
 
-def _process_refactor_action(action: Dict, project_base_path: str, editors:
-    Dict) ->bool:
+_REFACTOR_ACTION_TYPES = {'MODIFY', 'PARTIAL', 'CREATE', 'DELETE'}
+
+
+def _validate_refactor_action(action) ->Optional[str]:
+    """
+    Checks a single action from a refactor plan before any work is done on it,
+    so malformed actions are rejected without spending an LLM round-trip.
+
+    Returns:
+        An error message describing the problem, or None if the action is valid.
+    """
+    if not isinstance(action, dict):
+        return f'Action is not an object: {action}'
+    action_type = str(action.get('type', '')).upper()
+    if action_type not in _REFACTOR_ACTION_TYPES:
+        return f"Invalid action type '{action_type}'."
+    file_path = action.get('file')
+    if not file_path or not isinstance(file_path, str):
+        return f"Action is missing 'file' key: {action}"
+    if action_type == 'DELETE':
+        if not action.get('element'):
+            return f"DELETE action missing 'element' key: {action}"
+        if not file_path.endswith('.py'):
+            return 'DELETE actions are only supported for Python files.'
+    return None
+
+
+def _query_llm_until_code_block(prompt: str) ->str:
+    """
+    Streams an LLM response and stops reading as soon as the first fenced
+    code block is closed, returning the text received up to that point.
+    """
+    parts = []
+    stream = query_llm_stream(prompt)
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            if '`' in chunk and _CODE_BLOCK_PATTERN.search(''.join(parts)):
+                break
+    finally:
+        stream.close()
+    return ''.join(parts)
+
+
+def _get_or_load_editor(file_path_absolute: str, editors: Dict) ->Optional[
+    CodeEditor]:
+    """
+    Returns the in-memory editor for a file, loading it on first use. Files
+    that do not exist yet start from an empty buffer and are written (with
+    their parent directories) by _apply_refactor_changes.
+    """
+    if file_path_absolute not in editors:
+        try:
+            if os.path.exists(file_path_absolute):
+                editors[file_path_absolute] = CodeEditor(file_path_absolute)
+            else:
+                editors[file_path_absolute] = CodeEditor.from_source('',
+                    path=file_path_absolute)
+        except Exception as e:
+            ui_manager.show_error(
+                f'Error loading file {file_path_absolute}: {e}')
+            return None
+    return editors[file_path_absolute]
+
+
+def _apply_edit_action(action: Dict, file_path_relative: str,
+    file_path_absolute: str, editors: Dict) ->bool:
+    """
+    Handles MODIFY and PARTIAL actions by delegating to the file editor.
+
+    The plan's editor for the file is reused, so content staged by an earlier
+    action (including a CREATE not yet written to disk) is edited rather than
+    replaced by a fresh read of the file.
+    """
+    instruction = action.get('reason') or action.get('description', '')
+    editor = None
+    if file_path_absolute in editors or os.path.exists(file_path_absolute):
+        editor = _get_or_load_editor(file_path_absolute, editors)
+        if editor is None:
+            return False
+    edited_editor = handle_file_edit_command(file_path_absolute, instruction,
+        apply_changes_immediately=False, editor=editor)
+    if not edited_editor:
+        return False
+    editors[file_path_absolute] = edited_editor
+    return True
+
+
+def _apply_create_action(action: Dict, file_path_relative: str,
+    file_path_absolute: str, editors: Dict) ->bool:
+    """Handles CREATE actions by generating a new element or file."""
+    element_name = action.get('element_name')
+    description = action.get('description')
+    if not os.path.exists(file_path_absolute
+        ) and not file_path_relative.endswith('.py'):
+        # If a non-Python file does not exist, use handle_file_create_command to create it
+        success = handle_file_create_command(file_path_absolute, description, apply_changes_immediately=True)
+        if success is None: # handle_file_create_command returns None on failure or user cancellation
+            return False
+        return True
+    # Existing files and new Python files get the element added in memory
+    action_details = {'element_name': element_name, 'description': description}
+    prompt = _create_prompt_for_refactor_action('CREATE', file_path_relative,
+        action_details)
+    with ui_manager.show_spinner(
+        f"AI: CREATE on '{element_name or file_path_relative}'..."):
+        response = _query_llm_until_code_block(prompt)
+    code_blocks = extract_code(response)
+    new_content = code_blocks[0][1] if code_blocks else response.strip()
+    if not new_content:
+        ui_manager.show_error(
+            f'AI failed to generate content for action: {action}')
+        print(Panel(response, title="[yellow]AI's Raw Response[/]"))
+        return False
+    editor = _get_or_load_editor(file_path_absolute, editors)
+    if editor is None:
+        return False
+    anchor = action.get('anchor_element')
+    position = action.get('position', 'after')
+    if not editor.add_element(new_content, anchor_name=anchor, before=
+        position == 'before'):
+        ui_manager.show_error(
+            f"Failed to apply CREATE change for '{element_name}'.")
+        print(Panel(new_content, title=
+            f"[red]Problematic CREATE Code for '{element_name}'[/]",
+            border_style='red'))
+        return False
+    return True
+
+
+def _apply_delete_action(action: Dict, file_path_relative: str,
+    file_path_absolute: str, editors: Dict) ->bool:
+    """Handles DELETE actions by removing the element from the file's editor."""
+    element_name = action['element']
+    editor = _get_or_load_editor(file_path_absolute, editors)
+    if editor is None:
+        return False
+    if not editor.delete_element(element_name):
+        ui_manager.show_error(
+            f"Failed to delete '{element_name}' from '{file_path_relative}'.")
+        return False
+    ui_manager.show_success(
+        f"Successfully deleted '{element_name}' from '{file_path_relative}'.")
+    return True
+
+
+_REFACTOR_ACTION_HANDLERS = {'MODIFY': _apply_edit_action, 'PARTIAL':
+    _apply_edit_action, 'CREATE': _apply_create_action, 'DELETE':
+    _apply_delete_action}
+
+
+def _process_refactor_action(action: Dict, abs_paths: Dict[str, str],
+    editors: Dict) ->bool:
     """
     Processes a single refactoring action from the plan.
 
@@ -992,7 +1426,7 @@ def _process_refactor_action(action: Dict, project_base_path: str, editors:
 
     Args:
         action: A dictionary containing action details (type, file, element, etc.)
-        project_base_path: The absolute path to the project root
+        abs_paths: Mapping of each relative file path in the plan to its absolute path
         editors: Dictionary mapping file paths to their CodeEditor instances
 
     Returns:
@@ -1003,71 +1437,22 @@ def _process_refactor_action(action: Dict, project_base_path: str, editors:
         ui_manager.show_error(
             f"Action is missing 'file' key. Skipping: {action}")
         return False
-    file_path_absolute = os.path.join(project_base_path, file_path_relative)
+    file_path_absolute = abs_paths[file_path_relative]
     action_type = action.get('type', '').upper()
+    handler = _REFACTOR_ACTION_HANDLERS.get(action_type)
+    if handler is None:
+        ui_manager.show_error(f"Invalid action type '{action_type}'. Skipping."
+            )
+        return False
     try:
-        if action_type in ['MODIFY', 'PARTIAL']:
-            instruction = action.get('reason') or action.get('description', '')
-            edited_editor = handle_file_edit_command(file_path_absolute, instruction, apply_changes_immediately=False)
-            if edited_editor:
-                editors[file_path_absolute] = edited_editor
-                return True
-            else:
-                return False
-        elif action_type == 'CREATE':
-            element_name = action.get('element_name')
-            description = action.get('description')
-            if not os.path.exists(file_path_absolute):
-                # If file does not exist, use handle_file_create_command to create it
-                success = handle_file_create_command(file_path_absolute, description, apply_changes_immediately=True)
-                if success is None: # handle_file_create_command returns None on failure or user cancellation
-                    return False
-                return True
-            else:
-                # If file exists, it's a CREATE action for an element within the file
-                action_details = {'element_name': element_name, 'description':
-                    description}
-                prompt = _create_prompt_for_refactor_action('CREATE',
-                    file_path_relative, action_details)
-                with ui_manager.show_spinner(
-                    f"AI: {action_type} on '{element_name or file_path_relative}'..."):
-                    response = query_llm(prompt)
-                code_blocks = extract_code(response)
-                new_content = code_blocks[0][1] if code_blocks else response.strip()
-                if not new_content:
-                    ui_manager.show_error(
-                        f'AI failed to generate content for action: {action}')
-                    print(Panel(response, title="[yellow]AI's Raw Response[/]"))
-                    return False
-                if file_path_absolute not in editors:
-                    try:
-                        editors[file_path_absolute] = CodeEditor(file_path_absolute)
-                    except Exception as e:
-                        ui_manager.show_error(
-                            f'Error loading file {file_path_absolute}: {e}')
-                        return False
-                editor = editors[file_path_absolute]
-                anchor = action.get('anchor_element')
-                position = action.get('position', 'after')
-                if not editor.add_element(new_content, anchor_name=anchor,
-                    before=position == 'before'):
-                    ui_manager.show_error(
-                        f"Failed to apply CREATE change for '{element_name}'.")
-                    print(Panel(new_content, title=
-                        f"[red]Problematic CREATE Code for '{element_name}'[/]",
-                        border_style='red'))
-                    return False
-                return True
-        else:
-            ui_manager.show_error(
-                f"Invalid action type '{action_type}'. Skipping.")
-            return False
+        return handler(action, file_path_relative, file_path_absolute, editors)
     except Exception as e:
         error_msg = (
             f"Exception in {action_type} action on '{file_path_relative}': {str(e)}"
             )
         ui_manager.show_error(error_msg)
-        traceback.print_exc()
+        if _DEBUG:
+            traceback.print_exc()
         return False
 
 
@@ -1082,6 +1467,17 @@ def handle_project_refactor_command(instruction: str):
     actions = _get_refactor_plan(instruction)
     if not actions:
         return
+    valid_actions = []
+    for i, action in enumerate(actions, 1):
+        if (error_msg := _validate_refactor_action(action)):
+            ui_manager.show_error(f'Rejected action {i}: {error_msg}')
+        else:
+            valid_actions.append(action)
+    if not valid_actions:
+        ui_manager.show_error('The generated plan has no valid actions. Aborting.'
+            )
+        return
+    actions = valid_actions
     refactor_plan = {'instruction': instruction, 'actions': actions,
         'timestamp': datetime.now().isoformat()}
     memory_manager.add_refactor_plan(refactor_plan)
@@ -1090,65 +1486,15 @@ def handle_project_refactor_command(instruction: str):
         return
     editors: Dict[str, CodeEditor] = {}
     project_base_path = memory_manager.get_project_root()
+    abs_paths = {rel: os.path.join(project_base_path, rel) for rel in {a[
+        'file'] for a in actions}}
     successful_actions = 0
     total_actions = len(actions)
     failed_actions = []
     for i, action in enumerate(actions, 1):
         ui_manager.show_success(f'Processing action {i}/{total_actions}...')
-        action_type = action.get('type', '').upper()
-        file_path_relative = action.get('file')
-        if not file_path_relative:
-            error_msg = f"Action is missing 'file' key. Skipping: {action}"
-            ui_manager.show_error(error_msg)
-            failed_actions.append({'index': i, 'action': action, 'error':
-                error_msg})
-            continue
-        file_path_absolute = os.path.join(project_base_path, file_path_relative
-            )
         try:
-            if action_type == 'DELETE':
-                element_name = action.get('element')
-                if not element_name:
-                    error_msg = (
-                        f"DELETE action missing 'element' key. Skipping: {action}"
-                        )
-                    ui_manager.show_error(error_msg)
-                    failed_actions.append({'index': i, 'action': action,
-                        'error': error_msg})
-                    continue
-                if not file_path_relative.endswith('.py'):
-                    error_msg = (
-                        'DELETE actions are only supported for Python files. Skipping.'
-                        )
-                    ui_manager.show_error(error_msg)
-                    failed_actions.append({'index': i, 'action': action,
-                        'error': error_msg})
-                    continue
-                if file_path_absolute not in editors:
-                    try:
-                        editors[file_path_absolute] = CodeEditor(
-                            file_path_absolute)
-                    except Exception as e:
-                        error_msg = (
-                            f'Error loading file {file_path_absolute}: {e}')
-                        ui_manager.show_error(error_msg)
-                        failed_actions.append({'index': i, 'action': action,
-                            'error': error_msg})
-                        continue
-                editor = editors[file_path_absolute]
-                if editor.delete_element(element_name):
-                    successful_actions += 1
-                    ui_manager.show_success(
-                        f"Successfully deleted '{element_name}' from '{file_path_relative}'."
-                        )
-                else:
-                    error_msg = (
-                        f"Failed to delete '{element_name}' from '{file_path_relative}'."
-                        )
-                    ui_manager.show_error(error_msg)
-                    failed_actions.append({'index': i, 'action': action,
-                        'error': error_msg})
-            elif _process_refactor_action(action, project_base_path, editors):
+            if _process_refactor_action(action, abs_paths, editors):
                 successful_actions += 1
             else:
                 error_msg = (
@@ -1186,13 +1532,7 @@ def handle_project_refactor_command(instruction: str):
     _apply_refactor_changes(editors)
 
 
-def _create_prompt_for_commit_message(diff: str) ->str:
-    """
-    Create a dedicated prompt function for the 'commit' command. This prompt will
-    instruct the AI to analyze a git diff and generate a concise commit message
-    following the Conventional Commits standard.
-    """
-    return f"""You are an expert developer writing a Git commit message. Your task is to analyze the provided git diff and create a professional commit message.
+_COMMIT_PROMPT_HEADER = """You are an expert developer writing a Git commit message. Your task is to analyze the provided git diff and create a professional commit message.
 
 COMMIT MESSAGE RULES:
 - Follow the Conventional Commits specification
@@ -1212,11 +1552,32 @@ EXAMPLES OF GOOD COMMIT MESSAGES:
 Respond with ONLY the commit message - no markdown, quotes, or explanations.
 
 --- GIT DIFF TO ANALYZE ---
-{diff}
+"""
+_COMMIT_PROMPT_FOOTER = """
 
 Generate the commit message:"""
 
 
+def _create_prompt_for_commit_message(*diffs: bytes) ->List[str]:
+    """
+    Create a dedicated prompt function for the 'commit' command. This prompt will
+    instruct the AI to analyze a git diff and generate a concise commit message
+    following the Conventional Commits standard.
+
+    The prompt is returned as a list of parts so the diffs are passed to
+    query_llm as-is rather than copied into one large string. Each raw diff
+    is decoded exactly once here.
+    """
+    parts = [_COMMIT_PROMPT_HEADER]
+    for diff in diffs:
+        if diff:
+            if len(parts) > 1:
+                parts.append('\n')
+            parts.append(diff.decode('utf-8', 'replace'))
+    parts.append(_COMMIT_PROMPT_FOOTER)
+    return parts
+
+
 def handle_commit_command():
     """
     Orchestrates an AI-assisted Git commit workflow with improved error handling.
@@ -1231,19 +1592,16 @@ def handle_commit_command():
     except ValueError as e:
         ui_manager.show_error(str(e))
         return
-    changed_files = git_manager.get_changed_files()
+    changed_files, staged_diff, unstaged_diff = git_manager.snapshot()
     if not changed_files:
         ui_manager.show_success(
             'No changes to commit. Everything is up to date.')
         return
-    staged_diff = git_manager.get_diff(staged=True)
-    unstaged_diff = git_manager.get_diff()
-    full_diff = f'{staged_diff}\n{unstaged_diff}'.strip()
-    if not full_diff.strip():
+    if not staged_diff and not unstaged_diff:
         ui_manager.show_success(
             'No content changes detected (e.g., only file mode changes).')
         return
-    prompt = _create_prompt_for_commit_message(full_diff)
+    prompt = _create_prompt_for_commit_message(staged_diff, unstaged_diff)
     commit_message = query_llm(prompt).strip()
     if not commit_message:
         ui_manager.show_error(
@@ -1284,6 +1642,11 @@ def handle_commit_command():
         ui_manager.show_error('Commit aborted by user.')
 
 
+def _preview(content: str, limit: int) ->str:
+    """Truncates a retrieved document for display, marking the cut with '...'."""
+    return content if len(content) <= limit else content[:limit] + '...'
+
+
 def handle_rag_query_command(query: str):
     """
     Handles RAG query commands in the CLI.
@@ -1295,7 +1658,7 @@ def handle_rag_query_command(query: str):
         query: The query string to search for in the RAG system.
     """
     try:
-        rag_manager = RAGManager()
+        rag_manager = _get_rag()
         if rag_manager.get_document_count() == 0:
             ui_manager.show_error('RAG index is empty. Add documents first.')
             return
@@ -1308,7 +1671,7 @@ def handle_rag_query_command(query: str):
             border_style='cyan'))
         for i, (doc, score, metadata) in enumerate(results, 1):
             file_info = metadata.get('file', 'Unknown source')
-            content_preview = doc[:200] + '...' if len(doc) > 200 else doc
+            content_preview = _preview(doc, 200)
             result_panel = Panel(
                 f"""[dim]Source:[/] {file_info}
 [dim]Relevance:[/] {score:.4f}
@@ -1337,48 +1700,16 @@ If the documents don't contain enough information to answer the query, please sa
                 border_style='green'))
     except Exception as e:
         ui_manager.show_error(f'Error processing RAG query: {e}')
-        if os.getenv('OMNIFORGE_DEBUG'):
-            import traceback
+        if _DEBUG:
             traceback.print_exc()
 
 
-def interactive_mode() ->None:
-    global last_query, last_response, last_code
-    try:
-        from Testing.overlay_engine import show_sequential_popup
-        gui_available = True
-    except ImportError:
-        gui_available = False
-    print(Panel(
-        """[bold cyan]Omni Interactive Mode[/]
-[dim]Type 'help' for commands, 'exit' to quit.[/dim]"""
-        , border_style='cyan'))
-    personality_name = personality_manager.get_current_personality().get('name'
-        , 'Default')
-    gui_enabled = False
-    if gui_available:
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-                if config.get('gui_enabled', False):
-                    gui_enabled = True
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
-    refresh_status_panel(personality_name)
-    while True:
-        try:
-            user_input = ui_manager.get_user_input('\n> ')
-            if not user_input:
-                continue
-            command, *args = user_input.split(maxsplit=1)
-            arg_str = args[0] if args else ''
-            if command == 'exit':
-                memory_manager.save_memory()
-                print('[bold cyan]Goodbye![/]')
-                break
-            elif command == 'help':
-                print(
-                    """[bold]Commands:[/]
+def _current_personality_name() ->str:
+    return personality_manager.get_current_personality().get('name', 'Default'
+        )
+
+
+_HELP_TEXT = """[bold]Commands:[/]
 
   [bold cyan]Core & Project Commands[/]
   [yellow]send <prompt>[/]        - Ask the LLM a question.
@@ -1395,6 +1726,7 @@ def interactive_mode() ->None:
   [yellow]save <filename>[/]     - Save last AI response to a file.
   [yellow]list[/]               - List saved files.
   [yellow]run[/]                 - Run the last generated Python code.
+  [yellow]run![/]                - Run it in-process (faster, not isolated).
 
   [bold cyan]Session & Config[/]
   [yellow]history[/]             - Show the full chat history.
@@ -1402,170 +1734,266 @@ def interactive_mode() ->None:
   [yellow]backend <name>[/]      - Switch AI backend (e.g., openrouter, ollama).
   [yellow]models [src][/]        - Interactively list and select models.
   [yellow]set model <id>[/]      - Set the model directly by its ID.
-  [yellow]personality <cmd>[/]   - Manage AI personalities ('list', 'set', 'add').
-"""
-                    )
-            elif command == 'send':
-                last_query = arg_str
-                response = query_llm(arg_str)
-                last_response = response
-                memory_manager.add_chat_message('user', last_query)
-                memory_manager.add_chat_message('assistant', last_response)
-                if gui_enabled:
-                    threading.Thread(target=show_sequential_popup, args=(
-                        100, 100, response, f'Omni - {personality_name}'),
-                        daemon=True).start()
-                print(Panel(response, title='[cyan]Response[/]'))
-                if (code_blocks := extract_code(response)):
-                    last_code = code_blocks[0][1]
-            elif command == 'look':
-                look_command(arg_str)
-            elif command == 'look_all':
-                look_all_command()
-            elif command == 'create':
-                try:
-                    file_path, instruction = arg_str.split(' ', 1)
-                    handle_file_create_command(file_path.strip('"'),
-                        instruction.strip('"'), apply_changes_immediately=True)
-                except (ValueError, IndexError):
-                    ui_manager.show_error(
-                        'Usage: create <file_path> "<instruction>"')
-            elif command == 'edit':
-                try:
-                    file_path, instruction = arg_str.split(' ', 1)
-                    handle_file_edit_command(file_path.strip('"'),
-                        instruction.strip('"'))
-                except (ValueError, IndexError):
-                    ui_manager.show_error(
-                        'Usage: edit <file_path> "<instruction>"')
-            elif command == 'refactor':
-                if not arg_str:
-                    ui_manager.show_error('Usage: refactor "<instruction>"')
-                else:
-                    handle_project_refactor_command(arg_str.strip('"'))
-            elif command == 'commit':
-                handle_commit_command()
-            elif command == 'models':
-                list_models(arg_str.split())
-            elif command == 'set' and arg_str.startswith('model '):
-                set_model(arg_str[6:])
-            elif command == 'backend':
-                switch_backend(arg_str)
-            elif command == 'history':
-                ui_manager.display_history(memory_manager.get_memory_context())
-            elif command == 'memory' and arg_str == 'clear':
-                memory_manager.clear_memory()
-                ui_manager.show_success('✅ Memory cleared')
-            elif command == 'personality':
-                p_args = arg_str.split(maxsplit=1)
-                cmd = p_args[0] if p_args else ''
-                p_arg_str = p_args[1] if len(p_args) > 1 else ''
-                if cmd == 'list':
-                    for p in personality_manager.list_personalities():
-                        print(f"- {p['name']}: {p['description']}")
-                elif cmd == 'set' and p_arg_str:
-                    if personality_manager.set_current_personality(p_arg_str):
-                        personality_name = p_arg_str
-                        ui_manager.show_success(
-                            f'Set personality to {personality_name}')
-                    else:
-                        ui_manager.show_error('Personality not found.')
-                else:
-                    ui_manager.show_error(
-                        "Invalid personality command. Use 'list' or 'set <name>'."
-                        )
-            elif command == 'run':
-                run_python_code()
-            elif command == 'save':
-                if last_response:
-                    save_code(last_response, arg_str or
-                        f"omni_save_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-                        )
-                else:
-                    ui_manager.show_error('No response to save.')
-            elif command == 'list':
-                files = sorted(os.listdir(DEFAULT_SAVE_DIR))
-                print('\n'.join(f'  - {f}' for f in files) if files else
-                    '[yellow]No saved files.[/]')
-            elif command == 'rag':
-                if not arg_str:
-                    ui_manager.show_error('Usage: rag "<query>"')
-                else:
-                    from rag_manager import RAGManager
-                    project_root = memory_manager.get_project_root()
-                    if not project_root:
-                        ui_manager.show_error(
-                            "No project context in memory. Use 'look <directory>' first."
-                            )
-                        continue
-                    rag = RAGManager()
-                    if rag.get_document_count() == 0:
-                        ui_manager.show_error(
-                            'RAG index is empty. Please add documents first.')
-                        continue
-                    results = rag.search(arg_str, k=3)
-                    if not results:
-                        ui_manager.show_error('No relevant documents found.')
-                        continue
-                    print(Panel('[bold]RAG Results:[/]', title=
-                        '[cyan]Retrieval-Augmented Generation[/]'))
-                    for i, (content, score, metadata) in enumerate(results, 1):
-                        file_path = metadata.get('file', 'Unknown')
-                        print(
-                            f'[bold cyan]{i}. {file_path}[/] (Score: {score:.4f})'
-                            )
-                        print(Panel(content[:500] + '...' if len(content) >
-                            500 else content, border_style='dim'))
-                    follow_up = ui_manager.get_user_input(
-                        """
+  [yellow]personality <cmd>[/]   - Manage AI personalities ('list', 'set', 'add')."""
+_HELP_PANEL = Panel(Text.from_markup(_HELP_TEXT), border_style='cyan')
+
+
+def _cmd_help(arg_str: str) ->None:
+    print(_HELP_PANEL)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_popup() ->Optional[Callable]:
+    """Imports the GUI overlay on first use; returns None if it is unavailable."""
+    try:
+        from Testing.overlay_engine import show_sequential_popup
+    except ImportError:
+        return None
+    return show_sequential_popup
+
+
+def _cmd_send(arg_str: str) ->None:
+    global last_query, last_response, last_code
+    last_query = arg_str
+    response = query_llm(arg_str)
+    last_response = response
+    memory_manager.add_chat_message('user', last_query)
+    memory_manager.add_chat_message('assistant', last_response)
+    if _gui_enabled and (show_popup := _get_popup()) is not None:
+        threading.Thread(target=show_popup, args=(100, 100, response,
+            f'Omni - {_current_personality_name()}'), daemon=True).start()
+    print(Panel(response, title='[cyan]Response[/]'))
+    if (code_blocks := extract_code(response)):
+        last_code = code_blocks[0][1]
+
+
+def _cmd_create(arg_str: str) ->None:
+    file_path, sep, instruction = arg_str.partition(' ')
+    if not sep:
+        ui_manager.show_error('Usage: create <file_path> "<instruction>"')
+        return
+    handle_file_create_command(file_path.strip('"'), instruction.strip('"'),
+        apply_changes_immediately=True)
+
+
+def _cmd_edit(arg_str: str) ->None:
+    file_path, sep, instruction = arg_str.partition(' ')
+    if not sep:
+        ui_manager.show_error('Usage: edit <file_path> "<instruction>"')
+        return
+    handle_file_edit_command(file_path.strip('"'), instruction.strip('"'))
+
+
+def _cmd_refactor(arg_str: str) ->None:
+    if not arg_str:
+        ui_manager.show_error('Usage: refactor "<instruction>"')
+    else:
+        handle_project_refactor_command(arg_str.strip('"'))
+
+
+def _cmd_set(arg_str: str) ->None:
+    kind, _, value = arg_str.partition(' ')
+    if kind == 'model' and value:
+        set_model(value)
+    else:
+        ui_manager.show_error('Usage: set model <id>')
+
+
+def _cmd_memory(arg_str: str) ->None:
+    sub, _, _ = arg_str.partition(' ')
+    if sub == 'clear':
+        memory_manager.clear_memory()
+        ui_manager.show_success('✅ Memory cleared')
+    else:
+        ui_manager.show_error('Usage: memory clear')
+
+
+def _cmd_personality(arg_str: str) ->None:
+    cmd, _, p_arg_str = arg_str.partition(' ')
+    p_arg_str = p_arg_str.strip()
+    if cmd == 'list':
+        for p in personality_manager.list_personalities():
+            print(f"- {p['name']}: {p['description']}")
+    elif cmd == 'set' and p_arg_str:
+        if personality_manager.set_current_personality(p_arg_str):
+            ui_manager.show_success(f'Set personality to {p_arg_str}')
+        else:
+            ui_manager.show_error('Personality not found.')
+    else:
+        ui_manager.show_error(
+            "Invalid personality command. Use 'list' or 'set <name>'.")
+
+
+_save_counter = itertools.count()
+
+
+def _cmd_save(arg_str: str) ->None:
+    if last_response:
+        save_code(last_response, arg_str or
+            f"omni_save_{time.strftime('%Y%m%d_%H%M%S')}_{next(_save_counter)}.txt"
+            )
+    else:
+        ui_manager.show_error('No response to save.')
+
+
+def _cmd_list(arg_str: str) ->None:
+    with os.scandir(DEFAULT_SAVE_DIR) as entries:
+        files = sorted(entry.name for entry in entries if entry.is_file())
+    print('\n'.join(f'  - {f}' for f in files) if files else
+        '[yellow]No saved files.[/]')
+
+
+def _cmd_rag(arg_str: str) ->None:
+    if not arg_str:
+        ui_manager.show_error('Usage: rag "<query>"')
+        return
+    project_root = memory_manager.get_project_root()
+    if not project_root:
+        ui_manager.show_error(
+            "No project context in memory. Use 'look <directory>' first.")
+        return
+    rag = _get_rag()
+    if rag.get_document_count() == 0:
+        ui_manager.show_error('RAG index is empty. Please add documents first.'
+            )
+        return
+    results = rag.search(arg_str, k=3)
+    if not results:
+        ui_manager.show_error('No relevant documents found.')
+        return
+    print(Panel('[bold]RAG Results:[/]', title=
+        '[cyan]Retrieval-Augmented Generation[/]'))
+    for i, (content, score, metadata) in enumerate(results, 1):
+        file_path = metadata.get('file', 'Unknown')
+        print(f'[bold cyan]{i}. {file_path}[/] (Score: {score:.4f})')
+        print(Panel(_preview(content, 500), border_style='dim'))
+    follow_up = ui_manager.get_user_input(
+        """
 Would you like to ask a follow-up question with this context? (y/n): """
-                        )
-                    if follow_up.lower() in ['y', 'yes']:
-                        follow_up_query = ui_manager.get_user_input(
-                            'Follow-up query: ')
-                        if follow_up_query:
-                            context_parts = [
-                                f'Document {i} (Score: {score:.4f}):\n{content}'
-                                 for i, (content, score, _) in enumerate(
-                                results, 1)]
-                            context = '\n\n'.join(context_parts)
-                            rag_prompt = f"""Based on the following context, please answer the question.
+        )
+    if follow_up.lower() in ['y', 'yes']:
+        follow_up_query = ui_manager.get_user_input('Follow-up query: ')
+        if follow_up_query:
+            context = '\n\n'.join(
+                f'Document {i} (Score: {score:.4f}):\n{content}' for i, (
+                content, score, _) in enumerate(results, 1))
+            rag_prompt = f"""Based on the following context, please answer the question.
 
 Context:
 {context}
 
 Question: {follow_up_query}"""
-                            response = query_llm(rag_prompt)
-                            print(Panel(response, title=
-                                '[cyan]RAG-Augmented Response[/]'))
-            else:
+            response = query_llm(rag_prompt)
+            print(Panel(response, title='[cyan]RAG-Augmented Response[/]'))
+
+
+_gui_enabled = False
+COMMANDS: Dict[str, Callable[[str], None]] = {'help': _cmd_help, 'send':
+    _cmd_send, 'look': look_command, 'look_all': lambda _: look_all_command
+    (), 'create': _cmd_create, 'edit': _cmd_edit, 'refactor':
+    _cmd_refactor, 'commit': lambda _: handle_commit_command(), 'models':
+    lambda arg_str: list_models(arg_str.split()), 'set': _cmd_set,
+    'backend': switch_backend, 'history': lambda _: ui_manager.
+    display_history(memory_manager.get_memory_context()), 'memory':
+    _cmd_memory, 'personality': _cmd_personality, 'run': lambda _:
+    run_python_code(), 'run!': lambda _: run_python_code(isolated=False),
+    'save': _cmd_save, 'list': _cmd_list, 'rag': _cmd_rag}
+
+
+def _flush_and_goodbye() ->None:
+    """
+    Saves memory on a background thread while the goodbye message is printed,
+    then waits for the write to finish before returning.
+    """
+    saver = threading.Thread(target=memory_manager.save_memory)
+    saver.start()
+    print('[bold cyan]Goodbye![/]')
+    saver.join()
+
+
+def interactive_mode() ->None:
+    global _gui_enabled
+    ui_manager.set_commands([*COMMANDS, 'exit'])
+    print(Panel(
+        """[bold cyan]Omni Interactive Mode[/]
+[dim]Type 'help' for commands, 'exit' to quit.[/dim]"""
+        , border_style='cyan'))
+    try:
+        _gui_enabled = bool(personality_manager.config_cache.get().get(
+            'gui_enabled', False))
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    refresh_status_panel(_current_personality_name())
+    while True:
+        try:
+            user_input = ui_manager.get_user_input('\n> ')
+            if not user_input:
+                continue
+            command, *args = user_input.split(maxsplit=1)
+            arg_str = args[0] if args else ''
+            if command == 'exit':
+                _flush_and_goodbye()
+                break
+            handler = COMMANDS.get(command)
+            if handler is None:
                 ui_manager.show_error("Unknown command. Type 'help'.")
-            refresh_status_panel(personality_name)
+            else:
+                handler(arg_str)
+            refresh_status_panel(_current_personality_name())
         except KeyboardInterrupt:
-            memory_manager.save_memory()
-            print('\n[bold cyan]Goodbye![/]')
+            print()
+            _flush_and_goodbye()
             break
         except Exception as e:
             ui_manager.show_error(f'An unexpected error occurred: {e}')
 
 
-def run_python_code() ->None:
+def run_python_code(isolated: bool=True) ->None:
+    """
+    Runs the last generated Python code.
+
+    By default the code runs in a fresh interpreter process. With
+    isolated=False it is compiled and executed in this process in its own
+    namespace, avoiding the interpreter start-up cost; this gives the code
+    full access to the running CLI, so it is only used on explicit request.
+    """
     global last_code
     if not last_code:
         ui_manager.show_error('No Python code in memory to run.')
         return
-    temp_file = os.path.join(DEFAULT_SAVE_DIR, 'temp_run.py')
+    if not isolated:
+        try:
+            print('[bold cyan]\n--- Running Code (in-process) ---\n[/]')
+            exec(compile(last_code, '<omni>', 'exec'), {'__name__':
+                '__main__'})
+            print('[bold cyan]\n--- Code Finished ---\n[/]')
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                ui_manager.show_error(f'Code exited with status {e.code}')
+        except Exception as e:
+            ui_manager.show_error(f'Error running code: {e}')
+        return
     try:
-        with open(temp_file, 'w') as f:
-            f.write(last_code)
         print('[bold cyan]\n--- Running Code ---\n[/]')
-        subprocess.run([sys.executable, temp_file], check=True)
+        # -u keeps the child's stdout unbuffered on the pipe, and output is
+        # echoed as it arrives rather than per line so input() prompts show.
+        # The code is passed with -c because stdin stays the user's terminal
+        sys.stdout.flush()
+        out = getattr(sys.stdout, 'buffer', None)
+        with subprocess.Popen([sys.executable, '-u', '-c', last_code],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0
+            ) as proc:
+            for chunk in iter(lambda : proc.stdout.read(4096), b''):
+                if out is not None:
+                    out.write(chunk)
+                else:
+                    sys.stdout.write(chunk.decode(errors='replace'))
+                sys.stdout.flush()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args[:2])
         print('[bold cyan]\n--- Code Finished ---\n[/]')
     except Exception as e:
         ui_manager.show_error(f'Error running code: {e}')
-    finally:
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
 
 
 def save_code(content: str, filename: str) ->None:
@@ -1610,8 +2038,8 @@ def refresh_status_panel(personality_name: str) ->None:
     except:
         pass
     ui_manager.display_status_panel(personality_name, current_backend,
-        current_model, len(memory_manager.memory.get('chat', [])), len(
-        memory_manager.memory.get('look', [])), action_count)
+        current_model, memory_manager.chat_count, memory_manager.look_count,
+        action_count)
 
 
 if __name__ == '__main__':
@@ -1,33 +1,100 @@
 import json
+import os
 from typing import Dict, List, Optional
 
+try:
+    import orjson
+
+    def _loads(data: bytes):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def _loads(data: bytes):
+        return json.loads(data)
+
+    def _dumps(obj) -> bytes:
+        # Same layout as the orjson path, so the file does not depend on
+        # which one wrote it
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+DEFAULT_GUI_CONFIG = {
+    "gui_enabled": True,
+    "wake_word": "Jarvis",
+    "overlay_opacity": 0.8,
+    "font_size": 16
+}
+
+
+class ConfigCache:
+    """Keeps the parsed JSON config in memory, re-reading it only when the file changes."""
+
+    def __init__(self, config_file: str):
+        self.config_file = config_file
+        self.data: Dict = {}
+        self._mtime_ns: Optional[int] = None
+
+    def get(self) -> Dict:
+        """Return the parsed config, re-parsing only if the file's mtime changed.
+
+        Raises FileNotFoundError if the file is missing and json.JSONDecodeError
+        (which orjson's decode error subclasses) if it cannot be parsed.
+        """
+        mtime_ns = os.stat(self.config_file).st_mtime_ns
+        if mtime_ns != self._mtime_ns:
+            with open(self.config_file, 'rb') as f:
+                self.data = _loads(f.read())
+            self._mtime_ns = mtime_ns
+        return self.data
+
+    def save(self) -> None:
+        """Write the cached dict back to disk in a single dump."""
+        with open(self.config_file, 'wb') as f:
+            f.write(_dumps(self.data))
+        self._mtime_ns = os.stat(self.config_file).st_mtime_ns
+
+
+_config_caches: Dict[str, ConfigCache] = {}
+
+
+def get_config_cache(config_file: str) -> ConfigCache:
+    """Return the shared ConfigCache for a config file path."""
+    cache = _config_caches.get(config_file)
+    if cache is None:
+        cache = _config_caches[config_file] = ConfigCache(config_file)
+    return cache
+
+
 class PersonalityManager:
     """Manages AI personalities via JSON config."""
 
     def __init__(self, config_file: str):
         self.config_file = config_file
+        self.config_cache = get_config_cache(config_file)
         self.personalities: List[Dict[str, str]] = self.load_personalities()
+        self._by_name: Dict[str, Dict[str, str]] = {}
+        self._reindex()
         self.current_personality: Optional[str] = "default"  # Default
 
+    def _reindex(self) -> None:
+        """Rebuild the name -> personality index (the first entry wins on duplicate names)."""
+        self._by_name = {}
+        for p in self.personalities:
+            self._by_name.setdefault(p["name"], p)
+
     def load_personalities(self) -> List[Dict[str, str]]:
         """Load personalities from JSON; auto-create if missing."""
         default = [{"name": "default", "description": "Helpful assistant", "system_prompt": "You are a helpful AI assistant."}]
-        default_gui = {
-            "gui_enabled": True,
-            "wake_word": "Jarvis",
-            "overlay_opacity": 0.8,
-            "font_size": 16
-        }
         try:
-            with open(self.config_file, 'r') as f:
-                data = json.load(f)
-                if "personalities" not in data:
-                    data["personalities"] = default
-                if "gui_enabled" not in data:
-                    data.update(default_gui)
-                    self.save_personalities(data["personalities"])  # Save with defaults
-                
-                return data["personalities"]
+            data = self.config_cache.get()
+            if "personalities" not in data:
+                data["personalities"] = default
+            for key, value in DEFAULT_GUI_CONFIG.items():
+                data.setdefault(key, value)  # Written out on the next save
+
+            return data["personalities"]
         except FileNotFoundError:
             self.save_personalities(default)
             return default
@@ -37,15 +104,18 @@ class PersonalityManager:
             return default
 
     def save_personalities(self, personalities: List[Dict[str, str]]) -> None:
-        """Save with GUI config."""
-        data = {"personalities": personalities}
-        data.update({"gui_enabled": True, "wake_word": "Jarvis", "overlay_opacity": 0.8, "font_size": 16})  # Defaults
-        with open(self.config_file, 'w') as f:
-            json.dump(data, f, indent=4)
+        """Save with GUI config; existing GUI settings are kept, missing ones get defaults."""
+        data = self.config_cache.data
+        data["personalities"] = personalities
+        for key, value in DEFAULT_GUI_CONFIG.items():
+            data.setdefault(key, value)
+        self.config_cache.save()
 
     def add_personality(self, name: str, description: str, system_prompt: str) -> None:
         """Add a new personality."""
-        self.personalities.append({"name": name, "description": description, "system_prompt": system_prompt})
+        personality = {"name": name, "description": description, "system_prompt": system_prompt}
+        self.personalities.append(personality)
+        self._by_name.setdefault(name, personality)
         self.save_personalities(self.personalities)
 
     def list_personalities(self) -> List[Dict[str, str]]:
@@ -54,15 +124,11 @@ class PersonalityManager:
 
     def set_current_personality(self, name: str) -> bool:
         """Set the current personality."""
-        for p in self.personalities:
-            if p["name"] == name:
-                self.current_personality = name
-                return True
+        if name in self._by_name:
+            self.current_personality = name
+            return True
         return False
 
     def get_current_personality(self) -> Dict[str, str]:
         """Get the current personality dict."""
-        for p in self.personalities:
-            if p["name"] == self.current_personality:
-                return p
-        return {}  # Fallback
\ No newline at end of file
+        return self._by_name.get(self.current_personality, {})  # Fallback
\ No newline at end of file
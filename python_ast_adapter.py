@@ -1,26 +1,127 @@
 # python_ast_adapter.py
 
 """
-PythonASTAdapter - Concrete AST adapter for Python using built-in `ast` and `astor`.
+PythonASTAdapter - Concrete AST adapter for Python using built-in `ast`.
 
 This module implements the ASTAdapter interface specifically for Python,
-leveraging the standard library's `ast` module for parsing and
-manipulation, and `astor` for code generation.
+leveraging the standard library's `ast` module for parsing,
+manipulation and code generation (`ast.unparse`, with `astor` as the
+fallback on Pythons that lack it).
 """
 
 import ast
-import astor
+import bisect
 import difflib
-from typing import List, Optional, Dict, Tuple, Union
+import functools
+import io
+import re
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Dict, Tuple, Union
 from ast_adapter import ASTAdapter
 
-# Optional dependency check for asttokens (for enhanced partial edits)
-try:
+# ast.unparse (3.9+) is implemented on top of the C AST and is much faster than
+# astor's pure-Python visitor; astor is kept as the fallback for older Pythons.
+# A trailing newline is added so both produce the same file layout.
+if hasattr(ast, 'unparse'):
+    def _to_source(node: ast.AST) -> str:
+        return ast.unparse(node) + '\n'
+else:
+    def _to_source(node: ast.AST) -> str:
+        # Imported on first use; only these older Pythons need it
+        import astor
+        return astor.to_source(node)
+
+
+class BodyItem(NamedTuple):
+    """One statement of an element's body, as reported by get_element_structure."""
+    index: int
+    type: str
+    line_start: Optional[int]
+    line_end: Optional[int]
+    # Type-specific details ('assigns', 'has_body', 'returns'), or None
+    extra: Optional[Dict[str, Any]]
+
+
+def _body_item_extra(item: ast.AST) -> Optional[Dict[str, Any]]:
+    """Returns the type-specific details recorded for a body statement."""
+    if isinstance(item, ast.Assign) and item.targets:
+        target = item.targets[0]
+        if isinstance(target, ast.Name):
+            return {'assigns': target.id}
+    elif isinstance(item, (ast.If, ast.While, ast.For)):
+        return {'has_body': bool(item.body)}
+    elif isinstance(item, ast.Return):
+        return {'returns': True}
+    return None
+
+
+# Node types that can appear in statement lists (body, orelse, handlers, cases...)
+_STATEMENT_LIST_TYPES: Tuple[type, ...] = (ast.stmt, ast.excepthandler) + (
+    (ast.match_case,) if hasattr(ast, 'match_case') else ())
+
+
+def _walk_statements(root: ast.AST):
+    """
+    Like ast.walk, but only descends into statement lists.
+
+    Element-defining nodes (defs, classes, assignments, imports) are always
+    statements, so skipping expression subtrees yields them in exactly the
+    order ast.walk would while visiting a fraction of the nodes.
+    """
+    todo = deque([root])
+    while todo:
+        node = todo.popleft()
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list) and value and isinstance(value[0], _STATEMENT_LIST_TYPES):
+                todo.extend(value)
+        yield node
+
+
+# replace_partial's def/class heuristic; matching skips leading whitespace
+# without copying the snippet the way new_code.strip() would
+_DEF_PREFIX = re.compile(r'\s*(?:def |class |async def )')
+
+# Snippets that failed to parse, most recent last. Agents tend to retry the same
+# rejected snippet, so those fail without re-running the parser. Parsed trees
+# themselves are not memoized: they are spliced into (and later mutated inside)
+# the adapter's tree, and deep-copying a cached tree costs more than re-parsing.
+_PARSE_ERROR_CACHE_SIZE = 256
+_parse_errors: 'OrderedDict[str, SyntaxError]' = OrderedDict()
+
+
+def _parse_snippet(source: str) -> ast.Module:
+    """Parses a code snippet into a fresh module, failing fast on known-bad snippets."""
+    error = _parse_errors.get(source)
+    if error is not None:
+        _parse_errors.move_to_end(source)
+        raise SyntaxError(*error.args)
+    try:
+        return ast.parse(source)
+    except SyntaxError as e:
+        _parse_errors[source] = e.with_traceback(None)
+        if len(_parse_errors) > _PARSE_ERROR_CACHE_SIZE:
+            _parse_errors.popitem(last=False)
+        raise
+
+if TYPE_CHECKING:
     import asttokens
-    ASTTOKENS_AVAILABLE = True
-except ImportError:
-    ASTTOKENS_AVAILABLE = False
-    # print("Warning: asttokens not installed. Partial edits will be limited.")
+
+
+@functools.lru_cache(maxsize=None)
+def _asttokens():
+    """
+    Optional dependency check for asttokens (for enhanced partial edits).
+
+    Imported on the first parse rather than with this module, and the outcome
+    is remembered so a missing package is only searched for once.
+    """
+    try:
+        import asttokens
+        return asttokens
+    except ImportError:
+        # print("Warning: asttokens not installed. Partial edits will be limited.")
+        return None
 
 
 class PythonASTAdapter(ASTAdapter):
@@ -28,7 +129,7 @@ class PythonASTAdapter(ASTAdapter):
     Concrete implementation of ASTAdapter for Python source code.
 
     This adapter uses Python's built-in `ast` module to parse and manipulate
-    the code, and `astor` for code generation and source-to-source transformations.
+    the code, and `ast.unparse` (or `astor`) for code generation and source-to-source transformations.
     It holds the parsed AST tree and provides methods to interact with it
     according to the ASTAdapter interface.
     """
@@ -44,10 +145,26 @@ class PythonASTAdapter(ASTAdapter):
         self.source_code: str = source_code
         # Will hold the parsed AST tree
         self.tree: Optional[ast.AST] = None
+        # Mutation counter, bumped by every method that changes the tree.
+        # Derived data (the node map, the generated source) is cached against it.
+        self._version: int = 0
+        self._nodes_version: int = 0
+        # How many statements define each name, kept next to the node map so
+        # incremental updates can tell when a removal uncovers another definition
+        self._name_counts: Optional[Dict[str, int]] = None
+        self._source_cache: Optional[Tuple[int, str]] = None
+        # Line splits used by get_diff: the original never changes, the
+        # modified side is tied to the version it was generated from
+        self._original_lines: Optional[List[str]] = None
+        self._modified_lines: Optional[Tuple[int, List[str]]] = None
+        self._parent_bodies: Optional[Tuple[int, Dict[int, List[ast.AST]]]] = None
+        self._intervals: Dict[int, Optional[Tuple[List[int], List[int]]]] = {}
+        self._intervals_version: int = 0
+        self._main_block: Optional[Tuple[int, int]] = None
         # Will hold a mapping of element names to their AST nodes
         self.nodes: Dict[str, ast.AST] = {}
         # asttokens instance for enhanced source mapping (if available)
-        self.atok: Optional[asttokens.ASTTokens] = None
+        self.atok: Optional['asttokens.ASTTokens'] = None
 
         # Call the parent's __init__ which in turn calls _parse_and_map
         super().__init__(source_code)
@@ -67,16 +184,63 @@ class PythonASTAdapter(ASTAdapter):
         except SyntaxError as e:
             raise ValueError(f"Invalid Python syntax: {e}") from e
 
-        self.nodes = self._map_nodes()
-        if ASTTOKENS_AVAILABLE:
+        self._nodes, self._name_counts = self._build_index()
+        self._nodes_version = self._version
+        asttokens = _asttokens()
+        if asttokens is not None:
             try:
-                self.atok = asttokens.ASTTokens(source_code, parse=True)
+                # Reuse the tree parsed above instead of parsing a second time
+                self.atok = asttokens.ASTTokens(source_code, tree=self.tree)
             except Exception:
                 # If asttokens fails for any reason, continue without it
                 self.atok = None
         else:
             self.atok = None
 
+    @property
+    def nodes(self) -> Dict[str, ast.AST]:
+        """Mapping of element names to AST nodes, rebuilt lazily after mutations."""
+        if self._nodes_version != self._version:
+            self._nodes, self._name_counts = self._build_index()
+            self._nodes_version = self._version
+        return self._nodes
+
+    @nodes.setter
+    def nodes(self, value: Dict[str, ast.AST]) -> None:
+        self._nodes = value
+        # Counts are unknown for an assigned map; incremental updates fall back
+        # to a rebuild until the next one
+        self._name_counts = None
+        self._nodes_version = self._version
+
+    def _touch(self, reindexed: bool = False) -> None:
+        """
+        Records a tree mutation, invalidating the cached source.
+
+        Args:
+            reindexed: True if the caller patched the node map for this mutation
+                       with _index_node/_unindex_node and both reported the
+                       result exact, so it stays valid.
+        """
+        in_sync = self._nodes_version == self._version
+        self._version += 1
+        if reindexed and in_sync:
+            self._nodes_version = self._version
+
+    @staticmethod
+    def _element_names(node: ast.AST) -> List[str]:
+        """Returns the element names a single node defines (without recursing)."""
+        # Map functions and classes by name
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return [node.name]
+        # Map assignments by target variable name(s)
+        if isinstance(node, ast.Assign):
+            return [target.id for target in node.targets if isinstance(target, ast.Name)]
+        # Map imports by their alias or original name
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            return [alias.asname or alias.name for alias in node.names]
+        return []
+
     def _map_nodes(self) -> Dict[str, ast.AST]:
         """
         Walks the AST and creates a map of element names to nodes.
@@ -84,33 +248,130 @@ class PythonASTAdapter(ASTAdapter):
         Returns:
             A dictionary mapping element names (str) to their AST nodes.
         """
+        return self._build_index()[0]
+
+    def _build_index(self) -> Tuple[Dict[str, ast.AST], Dict[str, int]]:
+        """Builds the node map together with the per-name definition counts."""
         nodes: Dict[str, ast.AST] = {}
+        counts: Dict[str, int] = {}
         if not self.tree:
-            return nodes # Return empty dict if no tree
-
-        for node in ast.walk(self.tree):
-            # Map functions and classes by name
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                # Use 'not in' to prioritize top-level definitions in case of conflicts
-                if node.name not in nodes:
-                    nodes[node.name] = node
-            # Map assignments by target variable name(s)
-            elif isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id not in nodes:
-                        nodes[target.id] = node
-            # Map imports by their alias or original name
-            elif isinstance(node, ast.Import):
-                for alias in node.names:
-                    name = alias.asname or alias.name
-                    if name not in nodes:
-                        nodes[name] = node
-            elif isinstance(node, ast.ImportFrom):
-                for alias in node.names:
-                    name = alias.asname or alias.name
-                    if name not in nodes:
-                        nodes[name] = node
-        return nodes
+            return nodes, counts # Return empty maps if no tree
+
+        for node in _walk_statements(self.tree):
+            # Use setdefault to prioritize top-level definitions in case of conflicts
+            for name in self._element_names(node):
+                nodes.setdefault(name, node)
+                counts[name] = counts.get(name, 0) + 1
+        return nodes, counts
+
+    def _index_node(self, subtree: ast.AST) -> bool:
+        """
+        Adds the names defined in a newly inserted subtree to the node map.
+
+        Returns:
+            True if the map now matches a full rebuild. False if the subtree
+            redefines a name that is already defined elsewhere: which definition
+            wins then depends on position, so the caller must let the map rebuild.
+        """
+        counts = self._name_counts
+        if counts is None:
+            return False
+        defined = [(name, node) for node in _walk_statements(subtree)
+                   for name in self._element_names(node)]
+        exact = not any(counts.get(name) for name, _ in defined)
+        nodes = self._nodes
+        for name, node in defined:
+            counts[name] = counts.get(name, 0) + 1
+            nodes.setdefault(name, node)
+        return exact
+
+    def _unindex_node(self, subtree: ast.AST) -> bool:
+        """
+        Removes the map entries that point into a subtree being removed.
+
+        Returns:
+            True if the map now matches a full rebuild. False if a removed entry
+            had another definition elsewhere that should take its place.
+        """
+        counts = self._name_counts
+        if counts is None:
+            return False
+        exact = True
+        nodes = self._nodes
+        for node in _walk_statements(subtree):
+            for name in self._element_names(node):
+                remaining = counts.get(name, 0) - 1
+                if remaining > 0:
+                    counts[name] = remaining
+                else:
+                    counts.pop(name, None)
+                if nodes.get(name) is node:
+                    del nodes[name]
+                    if remaining > 0:
+                        exact = False
+        return exact
+
+    def _find_parent_body(self, target: ast.AST) -> Optional[List[ast.AST]]:
+        """
+        Returns the `body` list that directly contains a statement node.
+
+        Elements are almost always top-level, so the module body is checked
+        first. Nested statements are resolved through a statement -> body map
+        built with a single walk and cached until the tree is mutated.
+        """
+        if any(stmt is target for stmt in self.tree.body):
+            return self.tree.body
+        if self._parent_bodies is None or self._parent_bodies[0] != self._version:
+            parents: Dict[int, List[ast.AST]] = {}
+            for node in _walk_statements(self.tree):
+                body = getattr(node, 'body', None)
+                if isinstance(body, list):
+                    for stmt in body:
+                        parents.setdefault(id(stmt), body)
+            self._parent_bodies = (self._version, parents)
+        return self._parent_bodies[1].get(id(target))
+
+    def _body_intervals(self, body: List[ast.AST]) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        Returns the (start lines, end lines) of a body's statements for binary search.
+
+        Intervals are cached per body until the tree is mutated. Returns None if
+        the statements are not in ascending, non-overlapping line order (which can
+        happen after edits splice in nodes parsed from a snippet), in which case
+        callers fall back to a linear scan.
+        """
+        if self._intervals_version != self._version:
+            self._intervals = {}
+            self._intervals_version = self._version
+        key = id(body)
+        if key not in self._intervals:
+            starts = [stmt.lineno for stmt in body]
+            # ast.parse sets lineno/end_lineno on every statement (3.8+)
+            ends = [stmt.end_lineno or stmt.lineno for stmt in body]
+            ordered = all(ends[i] < starts[i + 1] for i in range(len(body) - 1))
+            self._intervals[key] = (starts, ends) if ordered else None
+        return self._intervals[key]
+
+    @staticmethod
+    def _is_main_guard(node: ast.AST) -> bool:
+        """Checks whether a statement is an `if __name__ == "__main__":` block."""
+        if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+            return False
+        test = node.test
+        if not (isinstance(test.left, ast.Name) and test.left.id == '__name__'):
+            return False
+        if len(test.ops) != 1 or not isinstance(test.ops[0], ast.Eq) or len(test.comparators) != 1:
+            return False
+        # String literals are ast.Constant on every supported Python (3.8+)
+        comp = test.comparators[0]
+        return isinstance(comp, ast.Constant) and comp.value == '__main__'
+
+    def _main_block_index(self) -> int:
+        """Returns the module-level index of the `__main__` block, or -1, cached per version."""
+        if self._main_block is None or self._main_block[0] != self._version:
+            idx = next((i for i, node in enumerate(self.tree.body) if self._is_main_guard(node)), -1)
+            self._main_block = (self._version, idx)
+        return self._main_block[1]
 
     def _find_statement_in_body(self, body: List[ast.AST], line_start: int, line_end: Optional[int] = None) -> Optional[Tuple[int, ast.AST]]:
         """
@@ -124,17 +385,32 @@ class PythonASTAdapter(ASTAdapter):
         Returns:
             A tuple of (index, statement node) if found, otherwise None.
         """
+        intervals = self._body_intervals(body)
+        if intervals is not None and (not line_end or line_start <= line_end):
+            starts, ends = intervals
+            if line_end:
+                # First statement ending at or after line_start; it overlaps the
+                # range iff it also starts no later than line_end
+                i = bisect.bisect_left(ends, line_start)
+                if i < len(body) and starts[i] <= line_end:
+                    return (i, body[i])
+            else:
+                i = bisect.bisect_left(starts, line_start)
+                if i < len(body) and starts[i] == line_start:
+                    return (i, body[i])
+            return None
+
+        # Linear scan for unordered bodies or inverted ranges
+        # (statements always carry line numbers; see _body_intervals)
         for i, stmt in enumerate(body):
-            if hasattr(stmt, 'lineno'):
-                if line_end:
-                    stmt_end = getattr(stmt, 'end_lineno', stmt.lineno)
-                    # Check for overlap or containment
-                    if (stmt.lineno <= line_start <= stmt_end) or (stmt.lineno <= line_end <= stmt_end) or \
-                       (line_start <= stmt.lineno and line_end >= stmt_end):
-                        return (i, stmt)
-                else:
-                    if stmt.lineno == line_start:
-                        return (i, stmt)
+            if line_end:
+                stmt_end = stmt.end_lineno or stmt.lineno
+                # Check for overlap or containment
+                if (stmt.lineno <= line_start <= stmt_end) or (stmt.lineno <= line_end <= stmt_end) or \
+                   (line_start <= stmt.lineno and line_end >= stmt_end):
+                    return (i, stmt)
+            elif stmt.lineno == line_start:
+                return (i, stmt)
         return None
 
     def _add_imports(self, new_import_nodes: List[Union[ast.Import, ast.ImportFrom]]) -> None:
@@ -147,30 +423,33 @@ class PythonASTAdapter(ASTAdapter):
         if not self.tree or not hasattr(self.tree, 'body'):
             return # Cannot add imports without a valid module tree
 
-        # Get string representations of existing imports to avoid duplicates
-        existing_imports_str = set()
+        # Canonical structural dumps of existing imports to avoid duplicates.
+        # ast.dump ignores positions, so equal imports compare equal without
+        # regenerating any source text.
+        existing_imports = set()
         last_import_index = -1
         for i, node in enumerate(self.tree.body):
             if isinstance(node, (ast.Import, ast.ImportFrom)):
-                try:
-                    existing_imports_str.add(astor.to_source(node).strip())
-                except Exception:
-                    # If astor fails, skip adding to set (might lead to potential duplicate, but safer)
-                    pass
+                existing_imports.add(ast.dump(node, annotate_fields=False))
                 last_import_index = i
 
         # Insert new imports after the last existing import
         # Reverse them so they are inserted in the correct order
+        to_insert = []
         for new_import in reversed(new_import_nodes):
-            try:
-                new_import_str = astor.to_source(new_import).strip()
-                if new_import_str not in existing_imports_str:
-                    self.tree.body.insert(last_import_index + 1, new_import)
-                    last_import_index += 1 # Update index for next insertion
-            except Exception:
-                # If we can't generate source, we can't check for duplicates, skip
-                self.tree.body.insert(last_import_index + 1, new_import)
-                last_import_index += 1
+            key = ast.dump(new_import, annotate_fields=False)
+            if key not in existing_imports:
+                # Record it so a snippet repeating an import adds it only once
+                existing_imports.add(key)
+                to_insert.append(new_import)
+
+        if to_insert:
+            # One slice assignment shifts the tail once instead of per import
+            self.tree.body[last_import_index + 1:last_import_index + 1] = to_insert
+            exact = True
+            for new_import in to_insert:
+                exact = self._index_node(new_import) and exact
+            self._touch(reindexed=exact)
 
     # --- Implementing abstract methods from ASTAdapter ---
 
@@ -183,9 +462,9 @@ class PythonASTAdapter(ASTAdapter):
         node = self.nodes.get(element_name)
         if node:
             try:
-                return astor.to_source(node)
+                return _to_source(node)
             except Exception:
-                # Handle potential astor issues gracefully
+                # Handle potential code generation issues gracefully
                 return None
         return None
 
@@ -195,36 +474,19 @@ class PythonASTAdapter(ASTAdapter):
         if not node:
             return None
 
-        structure = {
+        body = getattr(node, 'body', None)
+        return {
             'name': element_name,
             'type': node.__class__.__name__,
             'line_start': getattr(node, 'lineno', None),
             'line_end': getattr(node, 'end_lineno', None),
-            'body_items': []
+            'body_items': [
+                BodyItem(i, item.__class__.__name__, item.lineno, item.end_lineno,
+                         _body_item_extra(item))
+                for i, item in enumerate(body)
+            ] if isinstance(body, list) else []
         }
 
-        if hasattr(node, 'body'):
-            for i, item in enumerate(node.body):
-                item_info = {
-                    'index': i,
-                    'type': item.__class__.__name__,
-                    'line_start': getattr(item, 'lineno', None),
-                    'line_end': getattr(item, 'end_lineno', None)
-                }
-
-                if isinstance(item, ast.Assign) and item.targets:
-                    target = item.targets[0]
-                    if isinstance(target, ast.Name):
-                        item_info['assigns'] = target.id
-                elif isinstance(item, (ast.If, ast.While, ast.For)):
-                    item_info['has_body'] = bool(getattr(item, 'body', None))
-                elif isinstance(item, ast.Return):
-                    item_info['returns'] = True
-
-                structure['body_items'].append(item_info)
-
-        return structure
-
     def get_element_body_snippet(self, element_name: str, line_start: int, line_end: int) -> Optional[str]:
         """Extracts a snippet of code from within an element's body."""
         if not self.atok:
@@ -234,36 +496,32 @@ class PythonASTAdapter(ASTAdapter):
         if not node or not hasattr(node, 'body'):
             return None
 
-        statements = []
-        for stmt in node.body:
-            if hasattr(stmt, 'lineno') and hasattr(stmt, 'end_lineno'):
-                 # Check for overlap or containment of the statement within the requested range
-                stmt_start = stmt.lineno
-                stmt_end = stmt.end_lineno
-                if (stmt_start >= line_start and stmt_end <= line_end) or \
-                   (stmt_start <= line_end and stmt_end >= line_start): # Overlap
-                    statements.append(stmt)
+        intervals = self._body_intervals(node.body)
+        if intervals is not None and line_start <= line_end:
+            # Statements overlapping the range form one contiguous run of the body
+            starts, ends = intervals
+            statements = node.body[bisect.bisect_left(ends, line_start):bisect.bisect_right(starts, line_end)]
+        else:
+            statements = sorted((stmt for stmt in node.body
+                                 if stmt.lineno <= line_end and (stmt.end_lineno or stmt.lineno) >= line_start),
+                                key=lambda s: s.lineno)
 
         if not statements:
             return None
 
-        # Use asttokens to get the original source text for accuracy
-        try:
-            # Combine text ranges of the found statements
-            combined_text = ""
-            last_end_pos = None
-            for stmt in sorted(statements, key=lambda s: s.lineno):
-                # Get the text range for the statement
-                stmt_text = self.atok.get_text_range(stmt)
-                if last_end_pos is not None and stmt_text[0] > last_end_pos:
-                     # Add the original whitespace/newlines between statements
-                    combined_text += self.source_code[last_end_pos:stmt_text[0]]
-                combined_text += self.atok.get_text(stmt)
-                last_end_pos = stmt_text[1]
-            return combined_text.strip()
-        except Exception:
-            # Fallback if asttokens text retrieval fails
-            return '\n'.join(astor.to_source(stmt).strip() for stmt in statements)
+        # Use asttokens to get the original source text for accuracy. Nodes
+        # spliced in by an edit carry no tokens, so regenerate those instead.
+        if all(hasattr(stmt, 'first_token') for stmt in statements):
+            try:
+                # One slice of the original source covers the statements and
+                # the whitespace between them
+                start = self.atok.get_text_range(statements[0])[0]
+                end = self.atok.get_text_range(statements[-1])[1]
+                return self.source_code[start:end].strip()
+            except Exception:
+                pass
+        # Fallback if asttokens text retrieval fails
+        return '\n'.join(_to_source(stmt).strip() for stmt in statements)
 
     def replace_element(self, element_name: str, new_code: str) -> bool:
         """Replaces a named element with new code."""
@@ -271,7 +529,7 @@ class PythonASTAdapter(ASTAdapter):
             return False
 
         try:
-            new_ast_module = ast.parse(new_code)
+            new_ast_module = _parse_snippet(new_code)
         except SyntaxError:
             return False
 
@@ -284,28 +542,16 @@ class PythonASTAdapter(ASTAdapter):
         if new_imports:
             self._add_imports(new_imports)
 
-        # Walk the tree to find the parent node containing the element to replace
-        for parent_node in ast.walk(self.tree):
-            if hasattr(parent_node, 'body') and isinstance(parent_node.body, list):
-                try:
-                    old_node = self.nodes[element_name]
-                    idx = parent_node.body.index(old_node)
-                    # Remove the old node
-                    parent_node.body.pop(idx)
-                    # Insert the new nodes
-                    for i, new_node in enumerate(new_code_body):
-                        parent_node.body.insert(idx + i, new_node)
-
-                    # Update the nodes map: remove old, add new top-level definitions
-                    del self.nodes[element_name]
-                    for n in new_code_body:
-                        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                            self.nodes[n.name] = n
-                    return True
-                except (ValueError, KeyError):
-                    # ValueError from index(), KeyError from accessing self.nodes
-                    continue
-        return False # Element not found in any body
+        # Find the body list containing the element to replace
+        old_node = self.nodes.get(element_name)
+        parent_body = self._find_parent_body(old_node) if old_node else None
+        if parent_body is None:
+            return False # Element not found in any body
+
+        # Swap the old node for the new ones and patch the node map
+        idx = parent_body.index(old_node)
+        self._replace_statements(parent_body, idx, idx + 1, new_code_body)
+        return True
 
     def add_element(self, new_code: str, anchor_name: Optional[str] = None, before: bool = False) -> bool:
         """Adds a new element to the file."""
@@ -313,7 +559,7 @@ class PythonASTAdapter(ASTAdapter):
              return False
 
         try:
-            new_ast_module = ast.parse(new_code)
+            new_ast_module = _parse_snippet(new_code)
         except (SyntaxError, IndexError):
             return False
 
@@ -328,22 +574,7 @@ class PythonASTAdapter(ASTAdapter):
 
         # --- Determine insertion index ---
 
-        # Find the `if __name__ == "__main__":` block index
-        main_block_idx = -1
-        for i, node in enumerate(self.tree.body):
-            if (isinstance(node, ast.If) and
-                isinstance(getattr(node, 'test', None), ast.Compare) and
-                isinstance(getattr(node.test, 'left', None), ast.Name) and
-                node.test.left.id == '__name__' and
-                len(getattr(node.test, 'ops', [])) == 1 and isinstance(node.test.ops[0], ast.Eq) and
-                len(getattr(node.test, 'comparators', [])) == 1):
-
-                comp = node.test.comparators[0]
-                # Check for both ast.Constant ('__main__') and older ast.Str ('__main__')
-                if ((isinstance(comp, ast.Constant) and comp.value == '__main__') or
-                    (isinstance(comp, ast.Str) and comp.s == '__main__')): # type: ignore
-                    main_block_idx = i
-                    break
+        main_block_idx = self._main_block_index()
 
         insertion_index = -1
         if anchor_name:
@@ -372,14 +603,13 @@ class PythonASTAdapter(ASTAdapter):
             self.tree.body.extend(new_code_body)
         else:
             # Insert at the calculated position
-            for i, new_node in enumerate(new_code_body):
-                self.tree.body.insert(insertion_index + i, new_node)
+            self.tree.body[insertion_index:insertion_index] = new_code_body
 
-        # Update the nodes map with any new top-level definitions
+        # Add the new top-level definitions to the node map
+        exact = True
         for node in new_code_body:
-            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
-                self.nodes[node.name] = node # This might overwrite if names clash
-
+            exact = self._index_node(node) and exact
+        self._touch(reindexed=exact)
         return True
 
     def delete_element(self, element_name: str) -> bool:
@@ -390,20 +620,13 @@ class PythonASTAdapter(ASTAdapter):
         deleted = False
         if element_name in self.nodes:
             node_to_delete = self.nodes[element_name]
-            # Walk the tree to find the parent node containing the element
-            for node in ast.walk(self.tree):
-                if hasattr(node, 'body') and isinstance(node.body, list):
-                    try:
-                        node.body.remove(node_to_delete)
-                        deleted = True
-                        break # Assume element appears only once at top level
-                    except ValueError:
-                        continue # This parent doesn't contain the node
+            # Find the body list containing the element
+            parent_body = self._find_parent_body(node_to_delete)
+            if parent_body is not None:
+                parent_body.remove(node_to_delete)
+                deleted = True
             if deleted:
-                del self.nodes[element_name]
-                # Although nodes map is passed by ref in base __init__, we should call _map_nodes
-                # to ensure consistency after a direct tree modification.
-                self.nodes = self._map_nodes()
+                self._touch(reindexed=self._unindex_node(node_to_delete))
                 return True
 
         # If not found by node reference, try to find by name pattern matching (vars/imports)
@@ -418,35 +641,45 @@ class PythonASTAdapter(ASTAdapter):
                         break
                 if not match: # Keep the node if it doesn't match
                     new_body.append(node)
-            elif isinstance(node, ast.Import):
-                new_aliases = [alias for alias in node.names if not ((alias.name == element_name) or (alias.asname == element_name))]
-                if new_aliases:
-                    node.names = new_aliases
-                    new_body.append(node)
-                elif not any((alias.name == element_name) or (alias.asname == element_name) for alias in node.names):
-                    # Keep the node if none of its aliases match (should theoretically be the same as above)
-                     new_body.append(node)
-                else:
-                    deleted = True # The import node is being completely removed
-            elif isinstance(node, ast.ImportFrom):
-                new_aliases = [alias for alias in node.names if not ((alias.name == element_name) or (alias.asname == element_name))]
-                if new_aliases:
-                    node.names = new_aliases
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                # Split the aliases in one pass
+                found = False
+                new_aliases = []
+                for alias in node.names:
+                    if alias.name == element_name or alias.asname == element_name:
+                        found = True
+                    else:
+                        new_aliases.append(alias)
+                if not found:
                     new_body.append(node)
-                elif not any((alias.name == element_name) or (alias.asname == element_name) for alias in node.names):
-                     new_body.append(node)
                 else:
                     deleted = True
+                    if new_aliases:
+                        # Only this alias goes; the rest of the import stays
+                        node.names = new_aliases
+                        new_body.append(node)
+                    # Otherwise the import node is being completely removed
             else:
                 new_body.append(node)
 
         if deleted:
             self.tree.body = new_body
-            # Remap nodes after structural changes
-            self.nodes = self._map_nodes()
+            # Imports may have been trimmed in place; rebuild the map lazily
+            self._touch()
 
         return deleted
 
+    def _replace_statements(self, body: List[ast.AST], start: int, stop: int,
+                            new_statements: List[ast.AST]) -> None:
+        """Replaces body[start:stop] with new statements, patching the node map."""
+        exact = True
+        for stmt in body[start:stop]:
+            exact = self._unindex_node(stmt) and exact
+        body[start:stop] = new_statements
+        for stmt in new_statements:
+            exact = self._index_node(stmt) and exact
+        self._touch(reindexed=exact)
+
     def replace_partial(self, element_name: str, new_code: str,
                        line_start: Optional[int] = None, line_end: Optional[int] = None,
                        statement_index: Optional[int] = None) -> bool:
@@ -461,22 +694,22 @@ class PythonASTAdapter(ASTAdapter):
 
         # Parse the new code to get AST nodes for the replacement
         try:
-             # Heuristic: If new code looks like a def/class, extract its body.
-             # Otherwise, treat as standalone statements.
-            if new_code.strip().startswith(('def ', 'class ', 'async def ')):
-                # Parse as if it's a module with a single function/class
-                temp_module = ast.parse(new_code)
-                if temp_module.body and hasattr(temp_module.body[0], 'body'):
-                    new_statements = temp_module.body[0].body # Get the inner body
-                else:
-                    return False # Malformed attempt to define a func/class
-            else:
-                # Parse as a module and take its body
-                new_ast_module = ast.parse(new_code)
-                new_statements = new_ast_module.body
+            new_ast_module = _parse_snippet(new_code)
         except SyntaxError:
             return False # Invalid new code
 
+        # Heuristic: If new code looks like a def/class, extract its body.
+        # Otherwise, treat as standalone statements.
+        if _DEF_PREFIX.match(new_code):
+            # Parsed as a module with a single function/class
+            if new_ast_module.body and hasattr(new_ast_module.body[0], 'body'):
+                new_statements = new_ast_module.body[0].body # Get the inner body
+            else:
+                return False # Malformed attempt to define a func/class
+        else:
+            # Take the module body as-is
+            new_statements = new_ast_module.body
+
         if not new_statements: # Nothing to insert
             return False
 
@@ -485,7 +718,7 @@ class PythonASTAdapter(ASTAdapter):
             # Replace by statement index
             if 0 <= statement_index < len(node.body):
                 # Replace the single statement at index with the list of new statements
-                node.body[statement_index:statement_index+1] = new_statements
+                self._replace_statements(node.body, statement_index, statement_index + 1, new_statements)
                 return True
         elif line_start is not None:
             # Replace by line number(s)
@@ -497,32 +730,30 @@ class PythonASTAdapter(ASTAdapter):
                     end_idx = idx
                     # Iterate from the found index forward
                     for i in range(idx, len(node.body)):
-                        stmt = node.body[i]
-                        stmt_s_ln = getattr(stmt, 'lineno', None)
-                        stmt_e_ln = getattr(stmt, 'end_lineno', stmt_s_ln)
-                        if stmt_s_ln is not None and stmt_e_ln is not None:
-                            # Check if the statement ends within the range or starts within the range
-                            # This handles overlapping ranges correctly
-                             if stmt_e_ln <= line_end or stmt_s_ln <= line_end:
-                                 end_idx = i
-                             else:
-                                 break # Statement is past the end range
+                        # A statement starting within the range overlaps it (one
+                        # ending within the range necessarily starts there too)
+                        if node.body[i].lineno <= line_end:
+                            end_idx = i
                         else:
-                            break # Can't determine statement range
-                    node.body[idx:end_idx+1] = new_statements
+                            break # Statement is past the end range
+                    self._replace_statements(node.body, idx, end_idx + 1, new_statements)
                 else:
                     # line_end not specified, only replace the statement at line_start
-                    node.body[idx:idx+1] = new_statements
+                    self._replace_statements(node.body, idx, idx + 1, new_statements)
                 return True
 
         # If none of the conditions were met to perform a replacement
         return False
 
     def get_modified_source(self) -> str:
-        """Serializes the modified AST back into source code."""
+        """Serializes the modified AST back into source code, cached per tree version."""
         if self.tree:
+            if self._source_cache is not None and self._source_cache[0] == self._version:
+                return self._source_cache[1]
             try:
-                return astor.to_source(self.tree)
+                source = _to_source(self.tree)
+                self._source_cache = (self._version, source)
+                return source
             except Exception as e:
                  # Fallback error handling, should ideally not happen if tree is valid
                  return f"# Error generating source: {e}\n{self.source_code}"
@@ -532,22 +763,38 @@ class PythonASTAdapter(ASTAdapter):
 
     def get_diff(self) -> str:
         """Generates a diff between the original and modified source code."""
-        modified_source = self.get_modified_source()
+        buf = io.StringIO()
+        self.write_diff(buf)
+        return buf.getvalue()
+
+    def write_diff(self, fp) -> None:
+        """
+        Writes the unified diff between the original and modified source to fp.
+
+        difflib's lines are streamed straight into fp, so a caller writing to
+        a terminal or pager never builds the whole diff as one string.
+        """
+        # Nothing has been edited: skip regenerating the source altogether
+        if self._version == 0:
+            return
+
         # Ensure line endings are consistent for diffing, keepends=True preserves them
         # If source_code had different line endings, this might still cause issues,
         # but this is a standard approach.
-        original_lines = self.source_code.splitlines(keepends=True)
-        modified_lines = modified_source.splitlines(keepends=True)
+        if self._original_lines is None:
+            self._original_lines = self.source_code.splitlines(keepends=True)
+        if self._modified_lines is None or self._modified_lines[0] != self._version:
+            self._modified_lines = (self._version, self.get_modified_source().splitlines(keepends=True))
+        original_lines = self._original_lines
+        modified_lines = self._modified_lines[1]
 
         # Avoid diff header if contents are identical
         if original_lines == modified_lines:
-            return ""
+            return
 
-        diff = difflib.unified_diff(
+        fp.writelines(difflib.unified_diff(
             original_lines,
             modified_lines,
             fromfile='original',
             tofile='modified'
-        )
-        # Join the diff generator into a single string
-        return ''.join(diff)
\ No newline at end of file
+        ))
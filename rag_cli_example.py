@@ -1,8 +1,7 @@
 import os
 import sys
 import argparse
-from typing import List
-from rag_manager import RAGManager
+from typing import List, Optional
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
     '..')))
 
@@ -28,8 +27,8 @@ def create_sample_data() ->List[str]:
         ]
 
 
-def main():
-    """Main function demonstrating RAG through CLI."""
+def _build_parser() ->argparse.ArgumentParser:
+    """Build the command-line parser for the RAG example."""
     parser = argparse.ArgumentParser(description='RAG CLI Example')
     parser.add_argument('--query', '-q', type=str, help='Query to search for')
     parser.add_argument('--add', '-a', type=str, help=
@@ -40,7 +39,16 @@ def main():
         'Clear the index')
     parser.add_argument('--init', '-i', action='store_true', help=
         'Initialize with sample data')
-    args = parser.parse_args()
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def main(argv: Optional[List[str]]=None):
+    """Main function demonstrating RAG through CLI."""
+    args = _PARSER.parse_args(argv)
+    from rag_manager import RAGManager
     rag_manager = RAGManager()
     if args.clear:
         rag_manager.clear_index()
@@ -61,11 +69,12 @@ def main():
                 'No documents in index. Use --init to add sample data or --add to add documents.'
                 )
         else:
-            print(
+            lines = [
                 f'Documents in index ({rag_manager.get_document_count()} total):'
-                )
-            for i, meta in enumerate(rag_manager.metadata):
-                print(f"  {i + 1}. {meta['content']}")
+                ]
+            lines.extend(f'  {i + 1}. {content}' for i, content in
+                enumerate(rag_manager.get_contents(rag_manager.metadata)))
+            sys.stdout.write('\n'.join(lines) + '\n')
         return
     if args.query:
         if rag_manager.get_document_count() == 0:
@@ -74,11 +83,12 @@ def main():
                 )
             return
         results = rag_manager.search(args.query, k=3)
-        print(f"Top 3 results for '{args.query}':")
-        for i, (doc, score, meta) in enumerate(results, 1):
-            print(f'  {i}. [Score: {score:.4f}] {doc}')
+        lines = [f"Top 3 results for '{args.query}':"]
+        lines.extend(f'  {i}. [Score: {score:.4f}] {doc}' for i, (doc,
+            score, meta) in enumerate(results, 1))
+        sys.stdout.write('\n'.join(lines) + '\n')
         return
-    parser.print_help()
+    _PARSER.print_help()
 
 
 if __name__ == '__main__':
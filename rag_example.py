@@ -1,6 +1,9 @@
+import functools
 import os
 import sys
-from typing import List
+from typing import Dict, List, Optional
+import numpy as np
+from utils.query_cache import QueryCache, embedding_key
 """
 Example script demonstrating RAG (Retrieval-Augmented Generation) usage.
 
@@ -11,24 +14,56 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__),
     '..')))
 
 
+@functools.lru_cache(maxsize=1024)
+def _tokenize_query(query: str) ->frozenset:
+    """Lowercase and split a query into its set of words, memoized."""
+    return frozenset(query.lower().split())
+
+
 class SimpleRAG:
     """A simple RAG implementation for demonstration purposes."""
 
-    def __init__(self, knowledge_base: List[str]):
+    def __init__(self, knowledge_base: List[str], model_name: Optional[str
+        ]=None):
         """
         Initialize the RAG with a knowledge base.
         
         Args:
             knowledge_base: A list of strings representing the knowledge base.
+            model_name: Optional sentence transformer model. When given, the
+                knowledge base is embedded once and searched through a FAISS
+                inner-product index instead of by keyword overlap.
         """
         self.knowledge_base = knowledge_base
+        postings: Dict[str, List[int]] = {}
+        for i, doc in enumerate(knowledge_base):
+            for word in set(doc.lower().split()):
+                postings.setdefault(word, []).append(i)
+        self._postings = {word: np.array(ids, dtype=np.intp) for word, ids in
+            postings.items()}
+        order = sorted(range(len(knowledge_base)), key=knowledge_base.
+            __getitem__)
+        self._doc_rank = np.empty(len(knowledge_base), dtype=np.int64)
+        self._doc_rank[order] = np.arange(len(knowledge_base))
+        self.model = None
+        self.index = None
+        self.query_cache = QueryCache()
+        if model_name is not None and knowledge_base:
+            import faiss
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(model_name)
+            embeddings = self.model.encode(knowledge_base, batch_size=64,
+                convert_to_numpy=True, normalize_embeddings=True).astype(
+                'float32')
+            self.index = faiss.IndexFlatIP(embeddings.shape[1])
+            self.index.add(embeddings)
 
     def retrieve(self, query: str, top_k: int=3) ->List[str]:
         """
         Retrieve relevant documents from the knowledge base.
         
-        This is a simplified implementation using keyword matching.
-        In a real implementation, you would use embeddings and vector search.
+        Uses embeddings and vector search when a model was given, otherwise
+        a simplified keyword-matching fallback.
         
         Args:
             query: The query string.
@@ -37,14 +72,41 @@ class SimpleRAG:
         Returns:
             A list of relevant documents.
         """
-        query_words = set(query.lower().split())
-        scores = []
-        for doc in self.knowledge_base:
-            doc_words = set(doc.lower().split())
-            score = len(query_words.intersection(doc_words))
-            scores.append((score, doc))
-        scores.sort(reverse=True)
-        return [doc for score, doc in scores[:top_k]]
+        if self.index is not None:
+            q = self.model.encode([query], convert_to_numpy=True,
+                normalize_embeddings=True).astype('float32')
+            key = top_k, embedding_key(q)
+        else:
+            query_words = _tokenize_query(query)
+            key = top_k, query_words
+        docs = self.query_cache.get(key)
+        if docs is None:
+            if self.index is not None:
+                docs = self._vector_search(q, top_k)
+            else:
+                docs = self._keyword_search(query_words, top_k)
+            self.query_cache.put(key, docs)
+        return list(docs)
+
+    def _vector_search(self, q: np.ndarray, top_k: int) ->List[str]:
+        """Return the top_k documents closest to an encoded query."""
+        _, idx = self.index.search(q, min(top_k, len(self.knowledge_base)))
+        return [self.knowledge_base[i] for i in idx[0] if i >= 0]
+
+    def _keyword_search(self, query_words: frozenset, top_k: int) ->List[str]:
+        """Return the top_k documents sharing the most words with the query."""
+        n = len(self.knowledge_base)
+        k = min(top_k, n)
+        if k <= 0:
+            return []
+        hits = [self._postings[word] for word in query_words if word in
+            self._postings]
+        scores = np.bincount(np.concatenate(hits), minlength=n
+            ) if hits else np.zeros(n, dtype=np.int64)
+        keys = scores.astype(np.int64) * n + self._doc_rank
+        top = np.argpartition(-keys, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-keys[top])]
+        return [self.knowledge_base[i] for i in top]
 
     def generate(self, query: str, retrieved_docs: List[str]) ->str:
         """
@@ -60,16 +122,8 @@ class SimpleRAG:
         Returns:
             A generated answer.
         """
-        context = '\n'.join(retrieved_docs)
-        prompt = f"""
-        Context information:
-        {context}
-        
-        Question: {query}
-        
-        Based on the context provided above, please answer the question.
-        If the context doesn't contain relevant information, say so.
-        """
+        # An LLM-backed version would build its prompt from the joined
+        # documents here; the template generator reads them directly
         return self._simple_response_generator(query, retrieved_docs)
 
     def _simple_response_generator(self, query: str, retrieved_docs: List[str]
@@ -0,0 +1,76 @@
+import pytest
+
+from python_ast_adapter import PythonASTAdapter
+
+SOURCE = '''import os
+import sys as system
+
+LIMIT = 10
+
+
+def foo():
+    def helper():
+        return 1
+    x = helper()
+    return x
+
+
+def helper():
+    return 2
+
+
+class Box:
+    def helper(self):
+        return 3
+
+    def size(self):
+        return LIMIT
+'''
+
+
+def assert_index_matches_rebuild(adapter):
+    assert adapter.nodes == adapter._map_nodes()
+
+
+@pytest.mark.parametrize('edit', [
+    lambda a: a.delete_element('helper'),
+    lambda a: a.delete_element('foo'),
+    lambda a: a.delete_element('Box'),
+    lambda a: a.delete_element('system'),
+    lambda a: a.delete_element('LIMIT'),
+    lambda a: a.replace_element('helper', 'def helper():\n    return 4\n'),
+    lambda a: a.replace_element('helper', 'def other():\n    return 4\n'),
+    lambda a: a.replace_element('foo', 'def foo():\n    return 0\n'),
+    lambda a: a.add_element('def helper():\n    return 5\n', anchor_name='foo', before=True),
+    lambda a: a.add_element('def extra():\n    def size():\n        pass\n'),
+    lambda a: a.add_element('import json\n\ndef uses_json():\n    return json\n'),
+    lambda a: a.replace_partial('foo', 'def helper():\n    return 9', statement_index=0),
+    lambda a: a.replace_partial('foo', 'y = 1', statement_index=0),
+    lambda a: a.replace_partial('Box', 'def renamed(self):\n    return 3', statement_index=0),
+])
+def test_incremental_index_matches_rebuild(edit):
+    adapter = PythonASTAdapter(SOURCE)
+    assert edit(adapter)
+    assert_index_matches_rebuild(adapter)
+
+
+def test_delete_uncovers_nested_definition():
+    adapter = PythonASTAdapter(SOURCE)
+    assert adapter.delete_element('helper')
+    assert adapter.nodes['helper'] is adapter._map_nodes()['helper']
+    assert adapter.nodes['helper'].body[0].value.value == 1
+
+
+def test_sequence_of_edits_matches_rebuild():
+    adapter = PythonASTAdapter(SOURCE)
+    edits = [
+        lambda a: a.add_element('def extra():\n    return 0\n'),
+        lambda a: a.replace_element('extra', 'def extra():\n    return 1\n'),
+        lambda a: a.delete_element('helper'),
+        lambda a: a.replace_partial('Box', 'def size(self):\n    return 0', statement_index=1),
+        lambda a: a.delete_element('helper'),
+        lambda a: a.delete_element('extra'),
+    ]
+    for edit in edits:
+        assert edit(adapter)
+        assert_index_matches_rebuild(adapter)
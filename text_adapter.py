@@ -1,11 +1,14 @@
+import re
+from collections import deque
 from ast_adapter import ASTAdapter
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 """
 TextAdapter - Concrete AST adapter for plain text files.
 
 This module implements the ASTAdapter interface specifically for plain text files,
 treating the entire file content as a single element.
 """
+_LINE_BREAK = re.compile('\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
 
 
 class TextAdapter(ASTAdapter):
@@ -23,17 +26,57 @@ class TextAdapter(ASTAdapter):
         Args:
             source_code: The text content as a string.
         """
-        self.source_code: str = source_code
+        self.source_code = source_code
         super().__init__(source_code)
 
+    @property
+    def source_code(self) ->str:
+        """The text content, joining any chunks added since it was last read."""
+        if len(self._chunks) > 1:
+            self._chunks = deque([''.join(self._chunks)])
+        return self._chunks[0]
+
+    @source_code.setter
+    def source_code(self, value: str) ->None:
+        self._chunks = deque([value])
+        self._lines: Optional[Tuple[List[int], List[int]]] = None
+
+    @property
+    def nodes(self) ->Dict[str, str]:
+        """The single 'content' element, always reflecting the current text."""
+        return {'content': self.source_code}
+
+    @nodes.setter
+    def nodes(self, value: Dict[str, str]) ->None:
+        # The mapping is derived from the content; nothing to store
+        pass
+
     def _parse_and_map(self, source_code: str) ->None:
         """
         Creates a simple mapping for the text content.
 
+        The line-offset table is built lazily by _line_table.
+
         Args:
             source_code: The text content string.
         """
-        self.nodes = {'content': source_code}
+        self._lines = None
+
+    def _line_table(self) ->Tuple[List[int], List[int]]:
+        """Returns the (start, end) offsets of every line, using splitlines() boundaries."""
+        if self._lines is None:
+            source_code = self.source_code
+            starts = [0]
+            ends = []
+            for match in _LINE_BREAK.finditer(source_code):
+                ends.append(match.start())
+                starts.append(match.end())
+            if starts[-1] == len(source_code):
+                starts.pop()
+            else:
+                ends.append(len(source_code))
+            self._lines = starts, ends
+        return self._lines
 
     def list_elements(self) ->List[str]:
         """Lists the names of the main elements (just 'content' for text files)."""
@@ -49,8 +92,8 @@ class TextAdapter(ASTAdapter):
         """Gets detailed structural information about an element."""
         if element_name == 'content':
             return {'name': element_name, 'type': 'TextContent',
-                'line_start': 1, 'line_end': len(self.source_code.
-                splitlines()), 'body_items': []}
+                'line_start': 1, 'line_end': len(self._line_table()[0]),
+                'body_items': []}
         return None
 
     def get_element_body_snippet(self, element_name: str, line_start: int,
@@ -58,10 +101,11 @@ class TextAdapter(ASTAdapter):
         """Extracts a snippet of code from within an element's body."""
         if element_name != 'content':
             return None
-        lines = self.source_code.splitlines()
-        if 1 <= line_start <= len(lines) and 1 <= line_end <= len(lines
-            ) and line_start <= line_end:
-            return '\n'.join(lines[line_start - 1:line_end])
+        starts, ends = self._line_table()
+        line_count = len(starts)
+        if (1 <= line_start <= line_count and 1 <= line_end <= line_count and
+            line_start <= line_end):
+            return self.source_code[starts[line_start - 1]:ends[line_end - 1]]
         return None
 
     def replace_element(self, element_name: str, new_code: str) ->bool:
@@ -76,11 +120,12 @@ class TextAdapter(ASTAdapter):
         before: bool=False) ->bool:
         """Adds a new element to the file (appends to content for text files)."""
         if anchor_name is None or anchor_name == 'content':
+            # O(1) per edit; the chunks are joined once when next read
             if before:
-                self.source_code = new_code + self.source_code
+                self._chunks.appendleft(new_code)
             else:
-                self.source_code = self.source_code + new_code
-            self._parse_and_map(self.source_code)
+                self._chunks.append(new_code)
+            self._lines = None
             return True
         return False
 
@@ -98,14 +143,29 @@ class TextAdapter(ASTAdapter):
         """Replaces a specific part of an element's body."""
         if element_name != 'content':
             return False
-        lines = self.source_code.splitlines()
-        if line_start is not None and 1 <= line_start <= len(lines):
+        source = self.source_code
+        starts, ends = self._line_table()
+        line_count = len(starts)
+        if line_start is not None and 1 <= line_start <= line_count:
             start_idx = line_start - 1
             end_idx = start_idx if line_end is None else min(line_end - 1, 
-                len(lines) - 1)
+                line_count - 1)
             new_lines = new_code.splitlines() if new_code else []
-            lines[start_idx:end_idx + 1] = new_lines
-            self.source_code = '\n'.join(lines)
+            new_text = '\n'.join(new_lines)
+            if end_idx < start_idx:
+                # Range ends before it starts: insert ahead of line_start
+                cut_start = cut_end = starts[start_idx]
+                if new_lines:
+                    new_text += '\n'
+            elif new_lines:
+                cut_start, cut_end = starts[start_idx], ends[end_idx]
+            elif end_idx + 1 < line_count:
+                cut_start, cut_end = starts[start_idx], starts[end_idx + 1]
+            elif start_idx > 0:
+                cut_start, cut_end = ends[start_idx - 1], ends[end_idx]
+            else:
+                cut_start, cut_end = 0, len(source)
+            self.source_code = source[:cut_start] + new_text + source[cut_end:]
             self._parse_and_map(self.source_code)
             return True
         return False
@@ -1,39 +1,118 @@
 from rich.console import Console
 from rich.panel import Panel
-from rich.text import Text
+from rich.text import Span, Text
 from rich import box
 from contextlib import contextmanager
 from rich.markup import escape
-import gc
-try:
-    from prompt_toolkit import prompt
-    from prompt_toolkit.completion import WordCompleter
-    from prompt_toolkit.history import InMemoryHistory
-    from prompt_toolkit.styles import Style
-except ImportError:
-    print(
-        '[yellow]prompt_toolkit not installed. Falling back to basic input.[/]'
-        )
-    prompt = input
+import bisect
+import os
+import functools
+import weakref
+from types import SimpleNamespace
+from typing import Iterable, Optional
+
+
+@functools.lru_cache(maxsize=None)
+def _load_prompt_toolkit() ->Optional[SimpleNamespace]:
+    """
+    Imports prompt_toolkit on first use rather than with this module.
+
+    Returns the symbols UIManager needs, plus the shared default completer and
+    prompt style, or None when prompt_toolkit is not installed.
+    """
+    try:
+        from prompt_toolkit import prompt
+        from prompt_toolkit.completion import WordCompleter
+        from prompt_toolkit.history import InMemoryHistory
+        from prompt_toolkit.styles import Style
+    except ImportError:
+        print(
+            '[yellow]prompt_toolkit not installed. Falling back to basic input.[/]'
+            )
+        return None
+    return SimpleNamespace(prompt=prompt, WordCompleter=WordCompleter,
+        InMemoryHistory=InMemoryHistory, completer=WordCompleter(['send',
+        'look', 'look_all', 'create', 'edit', 'refactor', 'commit', 'save',
+        'list', 'run', 'history', 'memory', 'backend', 'models', 'set',
+        'personality', 'help', 'exit', 'action-history'], ignore_case=True
+        ), style=Style.from_dict({'prompt': 'bold cyan'}))
 
 
 class UIManager:
     """Manages interactive text-based UI with rich for display and prompt_toolkit for input."""
+    _live_registry: 'weakref.WeakSet' = weakref.WeakSet()
+    HISTORY_STYLES = {'User:': 'bold blue', 'AI:': 'bold green', 'File ':
+        'yellow'}
 
     def __init__(self):
         """Initializes the UI manager with a rich console and prompt_toolkit components."""
         self.console = Console()
-        self.history = InMemoryHistory()
-        self.completer = WordCompleter(['send', 'look', 'look_all',
-            'create', 'edit', 'refactor', 'commit', 'save', 'list', 'run',
-            'history', 'memory', 'backend', 'models', 'set', 'personality',
-            'help', 'exit', 'action-history'], ignore_case=True)
-        self.prompt_style = Style.from_dict({'prompt': 'bold cyan'})
+        self.compact = os.getenv('OMNIFORGE_COMPACT') == '1'
+        self._pt_loaded = False
+        self._commands: Optional[tuple] = None
+        self.history = None
+        self.completer = None
+        self.prompt_style = None
+        self._spinner_active = False
+
+    def set_commands(self, commands: Iterable[str]) ->None:
+        """
+        Sets the command names offered for tab completion.
+
+        The names feed the prompt_toolkit completer and are also registered
+        with readline for the basic input() fallback. The readline completer
+        bisects a sorted tuple, so only the matching range is scanned.
+        """
+        names = tuple(sorted(set(commands)))
+        self._commands = names
+        if self._pt_loaded:
+            self._build_completer()
+        try:
+            import readline
+        except ImportError:
+            return
+
+        def complete(text: str, state: int) ->Optional[str]:
+            index = bisect.bisect_left(names, text) + state
+            if index < len(names) and names[index].startswith(text):
+                return names[index]
+            return None
+        readline.set_completer(complete)
+        readline.parse_and_bind('tab: complete')
+
+    def _ensure_prompt_toolkit(self) ->Optional[SimpleNamespace]:
+        """
+        Builds the prompt_toolkit history, completer and style on first use.
+
+        Deferred from __init__ so that runs which never read input do not
+        pay for importing prompt_toolkit.
+        """
+        pt = _load_prompt_toolkit()
+        if not self._pt_loaded:
+            self._pt_loaded = True
+            if pt:
+                self.history = pt.InMemoryHistory()
+                self.prompt_style = pt.style
+                self._build_completer()
+        return pt
+
+    def _build_completer(self) ->None:
+        pt = _load_prompt_toolkit()
+        if pt is None:
+            return
+        if self._commands is None:
+            self.completer = pt.completer
+        else:
+            self.completer = pt.WordCompleter(list(self._commands),
+                ignore_case=True)
 
     def get_user_input(self, prompt_text: str) ->str:
         try:
-            return prompt(prompt_text, history=self.history, completer=self
-                .completer, style=self.prompt_style)
+            pt = self._ensure_prompt_toolkit()
+            if pt is None:
+                return input(prompt_text)
+            return pt.prompt(prompt_text, history=self.history, completer=
+                self.completer, style=self.prompt_style)
         except Exception:
             self.console.print(
                 '[yellow]Warning: Falling back to basic input.[/]')
@@ -43,17 +122,20 @@ class UIManager:
         if not history_text.strip():
             self.console.print('[dim]No history yet.[/]')
             return
-        lines = history_text.split('\n')
-        colored_text = Text()
-        for line in lines:
-            if line.startswith('User:'):
-                colored_text.append(line + '\n', style='bold blue')
-            elif line.startswith('AI:'):
-                colored_text.append(line + '\n', style='bold green')
-            elif line.startswith('File '):
-                colored_text.append(line + '\n', style='yellow')
-            else:
-                colored_text.append(line + '\n')
+        # Styles are attached as spans over the plain text, so chat content
+        # is never parsed as markup (a '[' on one line and a ']' on a later
+        # one would otherwise pair up as a tag)
+        styles = self.HISTORY_STYLES
+        spans = []
+        start = 0
+        for line in history_text.split('\n'):
+            end = start + len(line) + 1
+            style = next((s for p, s in styles.items() if line.startswith(p)),
+                None)
+            if style:
+                spans.append(Span(start, end, style))
+            start = end
+        colored_text = Text(history_text + '\n', spans=spans)
         self.console.print(Panel(colored_text, title=
             '[bold magenta]Chat History[/]', border_style='magenta', expand
             =False, box=box.ROUNDED))
@@ -69,13 +151,8 @@ class UIManager:
             with ui_manager.show_spinner("Loading..."):
                 # do work here
         """
-        if not hasattr(self, '_spinner_active'):
-            self._spinner_active = False
         if self._spinner_active:
-            try:
-                yield
-            except Exception as e:
-                raise e
+            yield
             return
         self._cleanup_stuck_rich_displays()
         self._spinner_active = True
@@ -84,18 +161,18 @@ class UIManager:
             try:
                 status_context = self.console.status(
                     f'[bold yellow]{message}[/]')
+                self._live_registry.add(status_context)
                 status_context.__enter__()
             except Exception:
                 status_context = None
                 self.console.print(f'[bold yellow]{message}[/]')
             yield
-        except Exception as e:
-            raise e
         finally:
             self._spinner_active = False
             if status_context is not None:
                 try:
                     status_context.__exit__(None, None, None)
+                    self._live_registry.discard(status_context)
                 except:
                     pass
             self._cleanup_stuck_rich_displays()
@@ -104,6 +181,9 @@ class UIManager:
         """
         Clean up stuck Rich live displays that prevent new ones from starting.
         Based on solution from: https://github.com/DLR-RM/stable-baselines3/issues/1645
+
+        Only displays started by show_spinner are tracked, in a weak registry,
+        so this no longer sweeps the whole heap with gc.get_objects().
         """
         try:
             if hasattr(self.console, '_live'
@@ -113,11 +193,7 @@ class UIManager:
                     self.console._live = None
                 except:
                     pass
-            rich_objects = [obj for obj in gc.get_objects() if hasattr(obj,
-                '__class__') and ('live' in type(obj).__name__.lower() or 
-                'progress' in type(obj).__name__.lower() or 'status' in
-                type(obj).__name__.lower()) and hasattr(obj, 'stop')]
-            for rich_obj in rich_objects:
+            for rich_obj in list(self._live_registry):
                 try:
                     if hasattr(rich_obj, 'stop'):
                         rich_obj.stop()
@@ -130,6 +206,12 @@ class UIManager:
 
     def display_status_panel(self, personality: str, backend: str, model:
         str, msg_count: int, look_count: int, action_count: int=0) ->None:
+        if self.compact:
+            # One plain line: no markup parsing or Panel layout
+            self.console.print(
+                f'{personality} | {backend} | {model} | {msg_count}m {look_count}f {action_count}a'
+                , style='cyan', markup=False, highlight=False)
+            return
         status_text = (
             f'[bold]Personality:[/] [green]{personality}[/] | [bold]Backend:[/] [green]{backend}[/] | [bold]Model:[/] [green]{model}[/] | [bold]Memory:[/] {msg_count} messages, {look_count} files, {action_count} actions'
             )
@@ -2,70 +2,118 @@ import sys
 from typing import Optional
 
 
+_GREEN = '\x1b[92m'
+_RED = '\x1b[91m'
+_YELLOW = '\x1b[93m'
+_BLUE = '\x1b[94m'
+_BOLD = '\x1b[1m'
+_UNDERLINE = '\x1b[4m'
+_RESET = '\x1b[0m'
+
+
+def green(text: str) ->str:
+    """Format text with green color."""
+    return f'{_GREEN}{text}{_RESET}'
+
+
+def red(text: str) ->str:
+    """Format text with red color."""
+    return f'{_RED}{text}{_RESET}'
+
+
+def yellow(text: str) ->str:
+    """Format text with yellow color."""
+    return f'{_YELLOW}{text}{_RESET}'
+
+
+def blue(text: str) ->str:
+    """Format text with blue color."""
+    return f'{_BLUE}{text}{_RESET}'
+
+
+def bold(text: str) ->str:
+    """Format text with bold styling."""
+    return f'{_BOLD}{text}{_RESET}'
+
+
+def underline(text: str) ->str:
+    """Format text with underline styling."""
+    return f'{_UNDERLINE}{text}{_RESET}'
+
+
 class ColorFormatter:
-    """Handles colored output formatting for terminal display."""
-    GREEN = '\x1b[92m'
-    RED = '\x1b[91m'
-    YELLOW = '\x1b[93m'
-    BLUE = '\x1b[94m'
-    BOLD = '\x1b[1m'
-    UNDERLINE = '\x1b[4m'
-    RESET = '\x1b[0m'
+    """
+    Handles colored output formatting for terminal display.
+
+    The classmethods delegate to the module-level functions, which hot paths
+    can import directly to skip the class attribute lookups.
+    """
+    GREEN = _GREEN
+    RED = _RED
+    YELLOW = _YELLOW
+    BLUE = _BLUE
+    BOLD = _BOLD
+    UNDERLINE = _UNDERLINE
+    RESET = _RESET
+    _color_supported: Optional[bool] = None
 
     @classmethod
     def green(cls, text: str) ->str:
         """Format text with green color."""
-        return f'{cls.GREEN}{text}{cls.RESET}'
+        return green(text)
 
     @classmethod
     def red(cls, text: str) ->str:
         """Format text with red color."""
-        return f'{cls.RED}{text}{cls.RESET}'
+        return red(text)
 
     @classmethod
     def yellow(cls, text: str) ->str:
         """Format text with yellow color."""
-        return f'{cls.YELLOW}{text}{cls.RESET}'
+        return yellow(text)
 
     @classmethod
     def blue(cls, text: str) ->str:
         """Format text with blue color."""
-        return f'{cls.BLUE}{text}{cls.RESET}'
+        return blue(text)
 
     @classmethod
     def bold(cls, text: str) ->str:
         """Format text with bold styling."""
-        return f'{cls.BOLD}{text}{cls.RESET}'
+        return bold(text)
 
     @classmethod
     def underline(cls, text: str) ->str:
         """Format text with underline styling."""
-        return f'{cls.UNDERLINE}{text}{cls.RESET}'
+        return underline(text)
 
     @classmethod
     def success(cls, text: str) ->str:
         """Format success message with green color."""
-        return cls.green(text)
+        return green(text)
 
     @classmethod
     def error(cls, text: str) ->str:
         """Format error message with red color."""
-        return cls.red(text)
+        return red(text)
 
     @classmethod
     def warning(cls, text: str) ->str:
         """Format warning message with yellow color."""
-        return cls.yellow(text)
+        return yellow(text)
 
     @classmethod
     def info(cls, text: str) ->str:
         """Format info message with blue color."""
-        return cls.blue(text)
+        return blue(text)
 
     @classmethod
     def supports_color(cls) ->bool:
-        """Check if the terminal supports color output."""
-        return hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
+        """Check if the terminal supports color output (computed once)."""
+        if cls._color_supported is None:
+            cls._color_supported = hasattr(sys.stdout, 'isatty'
+                ) and sys.stdout.isatty()
+        return cls._color_supported
 
     @classmethod
     def format_if_supported(cls, text: str, formatter) ->str:
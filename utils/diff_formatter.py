@@ -2,6 +2,11 @@ from typing import List, Union
 import sys
 import difflib
 from typing import Union, List
+import io
+
+_LINE_COLORS = {'+': '\x1b[32m', '-': '\x1b[31m', '@': '\x1b[36m'}
+_FILE_HEADERS = '+++', '---'
+_RESET = '\x1b[0m'
 
 
 def format_colored_diff(diff_lines: Union[List[str], str], stream=None) ->str:
@@ -21,20 +26,18 @@ def format_colored_diff(diff_lines: Union[List[str], str], stream=None) ->str:
         lines = diff_lines.splitlines(keepends=True)
     else:
         lines = diff_lines
-    output = []
-    for line in lines:
-        stripped = line.rstrip('\n')
-        if stripped.startswith('+') and not stripped.startswith('+++'):
-            colored_line = '\x1b[32m' + line + '\x1b[0m'
-        elif stripped.startswith('-') and not stripped.startswith('---'):
-            colored_line = '\x1b[31m' + line + '\x1b[0m'
-        elif stripped.startswith('@'):
-            colored_line = '\x1b[36m' + line + '\x1b[0m'
-        else:
-            colored_line = line
-        if stream:
-            stream.write(colored_line)
-        else:
-            output.append(colored_line)
+    colors = _LINE_COLORS
+    headers = _FILE_HEADERS
+    reset = _RESET
+    text = ''.join([(color + line + reset if line and (color := colors.get(
+        line[0])) and not line.startswith(headers) else line) for line in
+        lines])
     if not stream:
-        return ''.join(output)
+        return text
+    # Binary streams such as sys.stdout.buffer get UTF-8 bytes directly
+    stream.write(text.encode('utf-8') if isinstance(stream, io.
+        BufferedIOBase) else text)
+    # One flush for the whole diff, so a block-buffered pipe shows it at once
+    flush = getattr(stream, 'flush', None)
+    if flush is not None:
+        flush()
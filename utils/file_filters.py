@@ -1,5 +1,7 @@
 from typing import List, Optional, Callable
 import os
+import re
+import itertools
 import fnmatch
 """
 File Filters - Utility functions for filtering files based on patterns.
@@ -42,31 +44,50 @@ def filter_files_by_pattern(file_paths: List[str], include_patterns:
         >>> filter_files_by_pattern(files, include_patterns=['*.py'], exclude_patterns=['tests/*'])
         ['src/main.py']
     """
-    result = file_paths.copy()
+    if not include_patterns and not exclude_patterns:
+        return list(file_paths)
+    result = file_paths
     if include_patterns:
-        included_files = set()
-        for pattern in include_patterns:
-            if base_path and not os.path.isabs(pattern):
-                pattern = os.path.join(base_path, pattern)
-            for file_path in result:
-                full_path = file_path
-                if base_path and not os.path.isabs(file_path):
-                    full_path = os.path.join(base_path, file_path)
-                if fnmatch.fnmatch(full_path, pattern) or fnmatch.fnmatch(os
-                    .path.basename(file_path), pattern):
-                    included_files.add(file_path)
-        result = list(included_files)
+        match = _compile_patterns(include_patterns, base_path)
+
+        def is_included(file_path: str) ->bool:
+            full_path = file_path
+            if base_path and not os.path.isabs(file_path):
+                full_path = os.path.join(base_path, file_path)
+            return bool(match(os.path.normcase(full_path)) or match(os.path.
+                normcase(os.path.basename(file_path))))
+        result = [file_path for file_path in result if is_included(file_path)]
     if exclude_patterns:
-        for pattern in exclude_patterns:
-            if base_path and not os.path.isabs(pattern):
-                pattern = os.path.join(base_path, pattern)
-            result = [file_path for file_path in result if not (fnmatch.
-                fnmatch(file_path, pattern) or base_path and fnmatch.
-                fnmatch(os.path.join(base_path, file_path), pattern) or
-                fnmatch.fnmatch(os.path.basename(file_path), pattern))]
+        match = _compile_patterns(exclude_patterns, base_path)
+
+        def is_excluded(file_path: str) ->bool:
+            # Cheapest candidates first; the joined path is built only when
+            # neither the path nor its basename matched
+            return bool(match(os.path.normcase(file_path)) or match(os.path.
+                normcase(os.path.basename(file_path))) or base_path and
+                match(os.path.normcase(os.path.join(base_path, file_path))))
+        result = list(itertools.filterfalse(is_excluded, result))
     return result
 
 
+def _compile_patterns(patterns: List[str], base_path: Optional[str]
+    ) ->Callable[[str], Optional[re.Match]]:
+    """
+    Combine glob patterns into a single compiled regex matcher.
+
+    Patterns are resolved against base_path and case-normalized the same way
+    fnmatch.fnmatch does, so matching a normcased path is equivalent. Each
+    translated pattern is self-contained and anchored, so their alternation
+    matches exactly when any one pattern would.
+    """
+    translated = []
+    for pattern in patterns:
+        if base_path and not os.path.isabs(pattern):
+            pattern = os.path.join(base_path, pattern)
+        translated.append(fnmatch.translate(os.path.normcase(pattern)))
+    return re.compile('|'.join(translated)).match
+
+
 def create_file_filter(include_patterns: Optional[List[str]]=None,
     exclude_patterns: Optional[List[str]]=None, base_path: Optional[str]=None
     ) ->Callable[[List[str]], List[str]]:
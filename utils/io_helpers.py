@@ -1,10 +1,10 @@
-import astor
 from ast import AST
 from typing import Union
 import shutil
 import os
 from typing import TextIO
 import sys
+import tempfile
 from utils.logger import log_debug
 
 
@@ -13,6 +13,9 @@ def safe_write_file(file_path: str, content: Union[str, AST], create_backup:
     """
     Safely writes content to a file, optionally creating a backup of the original.
 
+    Dispatches to safe_write_ast or safe_write_text; callers that know which
+    they hold can call those directly.
+
     Args:
         file_path: The path to the file to write.
         content: The content to write (either a string or an AST node).
@@ -21,21 +24,61 @@ def safe_write_file(file_path: str, content: Union[str, AST], create_backup:
     Returns:
         True if the write was successful, False otherwise.
     """
+    if isinstance(content, AST):
+        return safe_write_ast(file_path, content, create_backup)
+    return safe_write_text(file_path, content, create_backup)
+
+
+def safe_write_ast(file_path: str, node: AST, create_backup: bool=True
+    ) ->bool:
+    """
+    Renders an AST node with astor and writes it like safe_write_text.
+
+    astor is imported here, on first use, rather than with this module.
+
+    Returns:
+        True if the write was successful, False otherwise.
+    """
+    try:
+        import astor
+        text = astor.to_source(node)
+    except Exception as e:
+        print(f'[ERROR] Failed to convert AST to source: {e}')
+        return False
+    return safe_write_text(file_path, text, create_backup)
+
+
+def safe_write_text(file_path: str, text: str, create_backup: bool=True
+    ) ->bool:
+    """
+    Safely writes text to a file, optionally creating a backup of the original.
+
+    If the write fails, the backup is moved back into place.
+
+    Returns:
+        True if the write was successful, False otherwise.
+    """
+    linked = False
     if create_backup and os.path.exists(file_path):
         try:
             backup_path = f'{file_path}.backup'
-            shutil.copy2(file_path, backup_path)
+            try:
+                # A hard link makes the backup without copying any data; the
+                # new content then goes to a fresh inode (see _replace_file)
+                if os.path.lexists(backup_path):
+                    os.remove(backup_path)
+                os.link(os.path.realpath(file_path), backup_path)
+                linked = True
+            except OSError:
+                shutil.copy2(file_path, backup_path)
         except Exception as e:
             print(f'[WARNING] Failed to create backup: {e}')
-    if isinstance(content, AST):
-        try:
-            content = astor.to_source(content)
-        except Exception as e:
-            print(f'[ERROR] Failed to convert AST to source: {e}')
-            return False
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if linked:
+            _replace_file(file_path, text)
+        else:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(text)
         return True
     except Exception as e:
         print(f'[ERROR] Failed to write to file: {e}')
@@ -49,6 +92,27 @@ def safe_write_file(file_path: str, content: Union[str, AST], create_backup:
         return False
 
 
+def _replace_file(file_path: str, content: str) ->None:
+    """
+    Write content to a new file and rename it over file_path.
+
+    Truncating in place would also empty a backup hard-linked to the file.
+    The permission bits of the original are kept and symlinks are followed,
+    so the link itself is not replaced.
+    """
+    target = os.path.realpath(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=
+        f'.{os.path.basename(target)}.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        shutil.copymode(target, tmp_path)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
 def confirm_change(diff_text: str, input_stream: TextIO=sys.stdin) ->bool:
     """
     Prompt the user to confirm or reject changes based on a diff.
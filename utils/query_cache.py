@@ -0,0 +1,81 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import numpy as np
+
+_MISSING = object()
+
+
+def embedding_key(embedding: np.ndarray, scale: int=127) ->bytes:
+    """
+    Bucket a normalized embedding into a hashable cache key.
+
+    Components are rounded to steps of 1/scale, so near-identical queries
+    (e.g. paraphrases or whitespace/case variants) land in the same bucket.
+
+    Args:
+        embedding: A 1-D L2-normalized embedding vector.
+        scale: Quantization steps per unit; higher is stricter. Steps are
+            clipped to the int8 range, so components of +/-1.0 do not wrap.
+
+    Returns:
+        The quantized vector as bytes.
+    """
+    steps = np.round(np.asarray(embedding, dtype=np.float32).ravel() * scale)
+    return np.clip(steps, -127, 127).astype(np.int8).tobytes()
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a time-to-live for retrieval results."""
+
+    def __init__(self, max_size: int=2000, ttl: Optional[float]=300):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept before evicting the oldest
+            ttl: Seconds an entry stays valid, or None for no expiry
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any=None) ->Any:
+        """Return the cached value for key, or default if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) ->None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = time.monotonic(), value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) ->None:
+        """Drop every entry, e.g. after the underlying index changed."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) ->float:
+        """Fraction of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) ->int:
+        return len(self._entries)
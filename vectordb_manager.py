@@ -1,63 +1,301 @@
 import os
+import atexit
 import json
 import hashlib
+import weakref
 from typing import List, Dict, Optional, Tuple
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import faiss
 
+try:
+    import orjson
+
+    def _loads(data: bytes):
+        return orjson.loads(data)
+
+    def _dumps_line(obj) ->bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.
+            OPT_APPEND_NEWLINE)
+except ImportError:
+
+    def _loads(data: bytes):
+        return json.loads(data)
+
+    def _dumps_line(obj) ->bytes:
+        return (json.dumps(obj) + '\n').encode('utf-8')
+
+INDEX_TYPES = 'fp16', 'sq8', 'flat', 'hnsw', 'ivfpq'
+_HNSW_M = 32
+# Candidate list while linking new vectors; faiss defaults to 40, which
+# costs recall on larger graphs
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 128
+_IVF_MAX_LISTS = 4096
+_IVF_POINTS_PER_LIST = 39
+# FastScan PQ: 4-bit codes looked up with SIMD shuffles. Each sub-quantizer
+# covers _PQ_DSUB dimensions, giving an even M with d/M in {2, 4, 8, 16, 20}
+_PQ_DSUB = 8
+_PQ_NBITS = 4
+ENCODER_BACKENDS = 'pt', 'onnx', 'onnx-int8'
+# Dynamic INT8 quantization profile; AVX2 kernels run on any recent x86 CPU
+_ONNX_INT8_CONFIG = 'avx2'
+_ONNX_INT8_FILE = f'onnx/model_qint8_{_ONNX_INT8_CONFIG}.onnx'
+# Saved indexes at least this large are memory-mapped read-only on load
+_MMAP_MIN_BYTES = 64 << 20
+# Live managers, flushed at interpreter exit. Held weakly so a manager that is
+# dropped (e.g. replaced after the index changed on disk) can be collected
+_open_managers: 'weakref.WeakSet[VectorDBManager]' = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_managers():
+    for manager in list(_open_managers):
+        manager.flush()
+
 
 class VectorDBManager:
     """Manages vector database operations for RAG using sentence transformers and FAISS."""
 
     def __init__(self, model_name: str='all-MiniLM-L6-v2', index_path:
-        Optional[str]=None):
+        Optional[str]=None, index_type: str='fp16', nprobe: int=16,
+        device: Optional[str]=None, backend: str='pt', mmap: bool=True):
         """
         Initialize the VectorDB manager.
 
         Args:
             model_name: Name of the sentence transformer model to use
             index_path: Path to save/load the FAISS index
+            index_type: Index built for a new or cleared store: 'fp16'
+                (exhaustive scan over half-precision vectors), 'sq8' (int8
+                scalar quantization, trained on the first batch added), 'flat'
+                (exact FP32, the reference for validating the others), 'hnsw'
+                for medium collections, or 'ivfpq' (4-bit FastScan PQ, trained
+                on the first batch added) for large ones
+            nprobe: Inverted lists scanned per query by an IVF index
+            device: Torch device for the encoder; defaults to CUDA when
+                available, else CPU
+            backend: Encoder runtime: 'pt' (PyTorch), 'onnx' (ONNX Runtime,
+                exported on first load) or 'onnx-int8' (ONNX with dynamic
+                INT8 quantization, exported once next to the index). The
+                ONNX backends need optimum[onnxruntime]
+            mmap: Memory-map a saved index of at least 64 MiB instead of
+                reading it into RAM, so the OS pages in only the parts that
+                queries touch. The index is read into memory on the first
+                add_documents call
         """
-        self.model = SentenceTransformer(model_name)
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}"
+                )
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(
+                f"Unknown encoder backend '{backend}', expected one of {ENCODER_BACKENDS}"
+                )
+        self.index_type = index_type
+        self.nprobe = nprobe
+        if device is None:
+            import torch
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = device
+        self.backend = backend
+        self.mmap = mmap
+        self._mmapped = False
         self.index_path = index_path or 'vectordb_index.bin'
+        self.model = self._load_encoder(model_name)
         self.metadata_path = self.index_path.replace('.bin', '_metadata.json')
+        # Document text, appended as UTF-8; metadata rows hold offsets into it
+        self.content_path = self.index_path.replace('.bin', '_content.bin')
         self.dimension = self.model.get_sentence_embedding_dimension()
         self.index = None
         self.metadata: List[Dict] = []
+        self._dirty = False
+        # Metadata rows already in the JSON-lines file; None means the file
+        # must be rewritten (a cleared store or the legacy JSON array)
+        self._persisted: Optional[int] = None
+        # Size of the metadata file after our last write; another writer
+        # changing it means appending our rows would desync it from the index
+        self._persisted_size: Optional[int] = None
         self._initialize_index()
+        _open_managers.add(self)
+
+    def _load_encoder(self, model_name: str) ->SentenceTransformer:
+        """
+        Load the sentence transformer on the configured backend.
+
+        For 'onnx-int8' the exported and quantized model is saved under an
+        'onnx_int8' directory beside the index, and later runs load it from
+        there.
+        """
+        if self.backend == 'pt':
+            return SentenceTransformer(model_name, device=self.device)
+        if self.backend == 'onnx':
+            return SentenceTransformer(model_name, device=self.device,
+                backend='onnx')
+        save_dir = os.path.join(os.path.dirname(self.index_path) or '.',
+            'onnx_int8', model_name.replace('/', '__'))
+        if not os.path.exists(os.path.join(save_dir, _ONNX_INT8_FILE)):
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+            model = SentenceTransformer(model_name, device=self.device,
+                backend='onnx')
+            model.save(save_dir)
+            export_dynamic_quantized_onnx_model(model, _ONNX_INT8_CONFIG,
+                save_dir)
+        return SentenceTransformer(save_dir, device=self.device, backend=
+            'onnx', model_kwargs={'file_name': _ONNX_INT8_FILE})
 
     def _initialize_index(self):
         """Initialize or load the FAISS index."""
         if os.path.exists(self.index_path) and os.path.exists(self.
             metadata_path):
-            self.index = faiss.read_index(self.index_path)
-            with open(self.metadata_path, 'r') as f:
-                self.metadata = json.load(f)
+            self._read_index(self.mmap and os.path.getsize(self.index_path) >=
+                _MMAP_MIN_BYTES)
+            self.metadata, self._persisted = self._read_metadata()
+            self._persisted_size = os.path.getsize(self.metadata_path)
         else:
-            self.index = faiss.IndexFlatIP(self.dimension)
+            self._new_index()
             self.metadata = []
+            self._persisted = None
+
+    def _read_metadata(self) ->Tuple[List[Dict], Optional[int]]:
+        """
+        Load metadata saved one JSON object per line, or as a legacy array.
+
+        Returns:
+            The metadata rows and how many of them the file already holds in
+            JSON-lines form (None for a legacy file, which is rewritten on the
+            next flush)
+        """
+        with open(self.metadata_path, 'rb') as f:
+            data = f.read()
+        if data.lstrip().startswith(b'['):
+            return _loads(data), None
+        rows = [_loads(line) for line in data.splitlines() if line]
+        return rows, len(rows)
+
+    def _read_index(self, mmap: bool=False):
+        """
+        Load the saved index, optionally memory-mapped and read-only.
+
+        Args:
+            mmap: Map the file instead of reading it; flat codes are mapped
+                too where the faiss build supports it. Index types the build
+                cannot map are read into memory instead
+        """
+        self.index = None
+        if mmap:
+            try:
+                self.index = faiss.read_index(self.index_path, faiss.
+                    IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | getattr(faiss,
+                    'IO_FLAG_MMAP_IFC', 0))
+            except RuntimeError:
+                mmap = False
+        if self.index is None:
+            self.index = faiss.read_index(self.index_path)
+        self._mmapped = mmap
+        self._set_search_params()
+
+    def _new_index(self, n_train: int=0):
+        """
+        Build an empty index of the configured type.
+
+        Args:
+            n_train: Size of the training batch, which sizes the IVF lists
+        """
+        if self.index_type == 'fp16':
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.
+                ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type == 'sq8':
+            index = faiss.IndexScalarQuantizer(self.dimension, faiss.
+                ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type == 'hnsw':
+            # Graph links plus FP16 vectors; needs no training
+            index = faiss.IndexHNSWSQ(self.dimension, faiss.ScalarQuantizer.
+                QT_fp16, _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = _HNSW_EF_CONSTRUCTION
+        elif self.index_type == 'ivfpq':
+            m = self.dimension // _PQ_DSUB
+            if self.dimension % _PQ_DSUB or m % 2:
+                raise ValueError(
+                    f'IVF-PQ needs an embedding dimension that is an even multiple of {_PQ_DSUB} (got {self.dimension})'
+                    )
+            nlist = max(1, min(_IVF_MAX_LISTS, n_train // _IVF_POINTS_PER_LIST))
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            # Older faiss builds lack FastScan; plain IVF-PQ takes the same args
+            ivfpq = getattr(faiss, 'IndexIVFPQFastScan', faiss.IndexIVFPQ)
+            index = ivfpq(quantizer, self.dimension, nlist, m, _PQ_NBITS,
+                faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(self.dimension)
+        self.index = index
+        self._mmapped = False
+        self._set_search_params()
+        return index
+
+    def _set_search_params(self):
+        """Apply the query-time knobs of approximate indexes."""
+        if hasattr(self.index, 'nprobe'):
+            self.index.nprobe = self.nprobe
+        if hasattr(self.index, 'hnsw'):
+            self.index.hnsw.efSearch = _HNSW_EF_SEARCH
 
     def add_documents(self, documents: List[str], metadatas: Optional[List[
         Dict]]=None):
         """
         Add documents to the vector database.
 
+        The documents are searchable immediately; they are written to disk by
+        the next flush.
+
         Args:
             documents: List of text documents to add
             metadatas: Optional list of metadata for each document
         """
         if metadatas is None:
             metadatas = [{}] * len(documents)
-        embeddings = self.model.encode(documents)
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings.astype(np.float32))
-        for i, meta in enumerate(metadatas):
-            doc_hash = hashlib.md5(documents[i].encode()).hexdigest()
-            meta_entry = {'id': len(self.metadata), 'hash': doc_hash,
-                'content': documents[i], **meta}
-            self.metadata.append(meta_entry)
-        self._save_index()
+        # encode() already groups inputs of similar length per batch
+        # (length-sorted, then restored to input order) to minimize padding
+        embeddings = self.model.encode(documents, batch_size=64,
+            convert_to_numpy=True, normalize_embeddings=True).astype(np.
+            float32, copy=False)
+        if self._mmapped:
+            self._read_index()
+        if not self.index.is_trained:
+            min_train = 2 ** _PQ_NBITS if self.index_type == 'ivfpq' else 1
+            if len(embeddings) < min_train:
+                raise ValueError(
+                    f"A '{self.index_type}' index is trained on its first batch, which needs at least {min_train} documents (got {len(embeddings)})"
+                    )
+            self._new_index(len(embeddings)).train(embeddings)
+        self.index.add(embeddings)
+        with open(self.content_path, 'ab') as store:
+            offset = store.tell()
+            for i, meta in enumerate(metadatas):
+                data = documents[i].encode('utf-8')
+                doc_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+                meta_entry = {'id': len(self.metadata), 'hash': doc_hash,
+                    'off': offset, 'len': len(data), **meta}
+                self.metadata.append(meta_entry)
+                store.write(data)
+                offset += len(data)
+        self._dirty = True
+
+    def get_contents(self, metas: List[Dict]) ->List[str]:
+        """
+        Read the texts of the documents the given metadata rows describe.
+
+        The content store is opened once for the whole batch.
+
+        Rows saved before the store existed carry their text inline.
+        """
+        contents = [meta.get('content') for meta in metas]
+        if None in contents:
+            with open(self.content_path, 'rb') as store:
+                for i, meta in enumerate(metas):
+                    if contents[i] is None:
+                        store.seek(meta['off'])
+                        contents[i] = store.read(meta['len']).decode('utf-8')
+        return contents
 
     def search(self, query: str, k: int=5) ->List[Tuple[str, float, Dict]]:
         """
@@ -70,22 +308,99 @@ class VectorDBManager:
         Returns:
             List of (document, score, metadata) tuples
         """
-        query_embedding = self.model.encode([query])
-        faiss.normalize_L2(query_embedding)
-        scores, indices = self.index.search(query_embedding.astype(np.
-            float32), k)
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.metadata):
-                doc_info = self.metadata[idx]
-                results.append((doc_info['content'], float(score), doc_info))
-        return results
+        return self.search_embedding(self.encode_query(query), k)
+
+    def encode_query(self, query: str) ->np.ndarray:
+        """Embed a query as a normalized float32 row vector of shape (1, dim)."""
+        return self.encode_queries([query])
+
+    def encode_queries(self, queries: List[str]) ->np.ndarray:
+        """Embed queries in one forward pass as normalized float32 rows."""
+        return self.model.encode(queries, batch_size=64, convert_to_numpy=
+            True, normalize_embeddings=True).astype(np.float32, copy=False)
+
+    def search_embedding(self, query_embedding: np.ndarray, k: int=5) ->List[
+        Tuple[str, float, Dict]]:
+        """
+        Search for relevant documents using an already encoded query.
+
+        Args:
+            query_embedding: Output of encode_query
+            k: Number of results to return
+
+        Returns:
+            List of (document, score, metadata) tuples
+        """
+        return self.search_embeddings(query_embedding, k)[0]
+
+    def search_embeddings(self, query_embeddings: np.ndarray, k: int=5
+        ) ->List[List[Tuple[str, float, Dict]]]:
+        """
+        Search for several encoded queries with a single index call.
+
+        Args:
+            query_embeddings: Output of encode_queries, one row per query
+            k: Number of results to return per query
+
+        Returns:
+            One list of (document, score, metadata) tuples per query
+        """
+        scores, indices = self.index.search(query_embeddings, k)
+        hits = [[(float(score), self.metadata[idx]) for score, idx in zip(
+            row_scores, row_indices) if 0 <= idx < len(self.metadata)] for 
+            row_scores, row_indices in zip(scores, indices)]
+        # Only the returned documents are read back from the content store
+        contents = iter(self.get_contents([meta for row in hits for _,
+            meta in row]))
+        batch = []
+        for row in hits:
+            results = []
+            for score, meta in row:
+                content = next(contents)
+                results.append((content, score, {**meta, 'content': content}))
+            batch.append(results)
+        return batch
+
+    def flush(self):
+        """
+        Write pending changes to disk.
+
+        add_documents only marks the store dirty, so a bulk ingest writes the
+        index once rather than once per batch. flush runs automatically at
+        interpreter exit for managers that are still alive; call it directly
+        to persist earlier, and before dropping a manager.
+        """
+        if self._dirty:
+            self._save_index()
+            self._dirty = False
 
     def _save_index(self):
         """Save the FAISS index and metadata to disk."""
-        faiss.write_index(self.index, self.index_path)
-        with open(self.metadata_path, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+        # Replace rather than truncate: an index mapped earlier still
+        # references the old file
+        tmp_path = self.index_path + '.tmp'
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+        # Metadata is append-only: only rows added since the last save are
+        # written, unless the file has to be replaced wholesale. The index was
+        # just replaced with ours, so if another manager saved in between, the
+        # metadata is rewritten to match it
+        if self._persisted is not None and self._metadata_size(
+            ) != self._persisted_size:
+            self._persisted = None
+        start = self._persisted or 0
+        mode = 'wb' if self._persisted is None else 'ab'
+        with open(self.metadata_path, mode) as f:
+            f.writelines(_dumps_line(meta) for meta in self.metadata[start:])
+            self._persisted_size = f.tell()
+        self._persisted = len(self.metadata)
+
+    def _metadata_size(self) ->Optional[int]:
+        """Size of the metadata file on disk, or None if it is missing."""
+        try:
+            return os.path.getsize(self.metadata_path)
+        except OSError:
+            return None
 
     def get_document_count(self) ->int:
         """Get the number of documents in the index."""
@@ -93,6 +408,9 @@ class VectorDBManager:
 
     def clear_index(self):
         """Clear the index and metadata."""
-        self.index = faiss.IndexFlatIP(self.dimension)
+        self._new_index()
         self.metadata = []
+        self._persisted = None
         self._save_index()
+        self._dirty = False
+        open(self.content_path, 'wb').close()